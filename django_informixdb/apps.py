@@ -0,0 +1,6 @@
+from django.apps import AppConfig
+
+
+class InformixDBConfig(AppConfig):
+    name = 'django_informixdb'
+    verbose_name = 'Informix'
@@ -3,6 +3,7 @@ informix database backend for Django.
 
 Requires informixdb
 """
+import functools
 import logging
 import os
 import sys
@@ -10,20 +11,27 @@ import platform
 import time
 import random
 import re
+import weakref
+from contextlib import contextmanager
 
 from django.db import connections
 from django.db.backends.base.base import BaseDatabaseWrapper
 from django.db.backends.base.validation import BaseDatabaseValidation
+from django.db.models.sql.constants import GET_ITERATOR_CHUNK_SIZE
 from django.core.exceptions import ImproperlyConfigured
 from django.core import signals
 from django.utils.encoding import smart_str
 
+from .breaker import OPEN, get_breaker
 from .client import DatabaseClient
+from .cooperative import get_runner
 from .creation import DatabaseCreation
 from .introspection import DatabaseIntrospection
 from .operations import DatabaseOperations
+from .pool import get_pool
 from .features import DatabaseFeatures
 from .schema import DatabaseSchemaEditor
+from .statements import StatementCache, is_ddl, is_stale_statement_error
 
 try:
     import pyodbc
@@ -50,6 +58,26 @@ def decoder(value, encodings=('utf-8',)):
     raise UnicodeDecodeError("unable to decode `{value}`")
 
 
+_ASCII = bytes(range(128))
+
+# SQLSTATEs of a driver refusing to bind parameters as arrays: optional
+# feature not implemented, invalid attribute, invalid precision or scale,
+# invalid parameter type and restricted data type attribute violation
+ARRAY_BINDING_UNSUPPORTED_STATES = frozenset(['HYC00', 'HY092', 'HY104', 'HY105', '07006'])
+
+
+def is_array_binding_unsupported(exc):
+    return bool(exc.args) and exc.args[0] in ARRAY_BINDING_UNSUPPORTED_STATES
+
+
+def is_ascii_compatible(encoding):
+    """Whether `encoding` decodes 7-bit ASCII bytes to the same characters as ASCII does"""
+    try:
+        return _ASCII.decode(encoding) == _ASCII.decode('ascii')
+    except (LookupError, UnicodeDecodeError):
+        return False
+
+
 class DatabaseWrapper(BaseDatabaseWrapper):
     vendor = 'informixdb'
     Database = pyodbc
@@ -68,6 +96,29 @@ class DatabaseWrapper(BaseDatabaseWrapper):
         'SERIALIZABLE': pyodbc.SQL_TXN_SERIALIZABLE,
     }
 
+    # Clauses accepted by set_isolation(), i.e. SET ISOLATION TO <clause>
+    ISOLATION_CLAUSES = (
+        'dirty read',
+        'committed read',
+        'committed read retain update locks',
+        'repeatable read',
+    )
+
+    # The SET ISOLATION clause matching each ISOLATION_LEVEL option
+    ISOLATION_LEVEL_CLAUSES = {
+        'READ_COMMITED': 'committed read',
+        'READ_UNCOMMITTED': 'dirty read',
+        'REPEATABLE_READ': 'repeatable read',
+        'SERIALIZABLE': 'repeatable read',
+    }
+
+    # Server defaults for a database with (non-ANSI) transaction logging,
+    # restored by session_settings() when the previous setting is unknown
+    DEFAULT_SESSION_STATE = {
+        'isolation': 'committed read',
+        'lock_mode_wait': 0,
+    }
+
     data_types = {
         'AutoField': 'serial',
         'BigAutoField': 'bigserial',
@@ -97,6 +148,26 @@ class DatabaseWrapper(BaseDatabaseWrapper):
         'UUIDField': 'char(32)',
     }
 
+    # ODBC parameter types used for array binding (FAST_EXECUTEMANY), keyed on
+    # the Informix column type from data_types without its length qualifier.
+    # Types missing here are left for the driver to describe.
+    input_size_types = {
+        'serial': pyodbc.SQL_INTEGER,
+        'bigserial': pyodbc.SQL_BIGINT,
+        'integer': pyodbc.SQL_INTEGER,
+        'bigint': pyodbc.SQL_BIGINT,
+        'smallint': pyodbc.SQL_SMALLINT,
+        'smallfloat': pyodbc.SQL_REAL,
+        'decimal': pyodbc.SQL_DECIMAL,
+        'date': pyodbc.SQL_TYPE_DATE,
+        'datetime year to fraction': pyodbc.SQL_TYPE_TIMESTAMP,
+        'char': pyodbc.SQL_CHAR,
+        'lvarchar': pyodbc.SQL_VARCHAR,
+    }
+
+    # Column types the driver cannot bind as parameter arrays.
+    array_unbindable_types = ('blob', 'byte', 'text')
+
     data_type_check_constraints = {
         'PositiveIntegerField': '%(column)s >= 0',
         'PositiveSmallIntegerField': '%(column)s >= 0',
@@ -153,7 +224,45 @@ class DatabaseWrapper(BaseDatabaseWrapper):
         self._validation_interval = options.get("VALIDATION_INTERVAL", 300)
         self._next_validation = time.time() + self._validation_interval
         self._validation_query = options.get("VALIDATION_QUERY", "SELECT 1 FROM sysmaster:sysdual")
+        self._validation_mode = options.get("VALIDATION_MODE", "eager")
+        if self._validation_mode not in ('eager', 'lazy'):
+            raise ImproperlyConfigured("VALIDATION_MODE must be 'eager' or 'lazy'")
+        # set at the start of a request in lazy mode, until the connection is used
+        self._validation_pending = False
+        self._validation_stats = {
+            'validations': 0,
+            'failures': 0,
+            'total_time': 0.0,
+            'last_time': None,
+        }
         self.encodings = options.get('encodings', ('utf-8', 'cp1252', 'iso-8859-1'))
+        # pure ASCII values decode the same with the first encoding as with ASCII
+        self._ascii_fast_path = is_ascii_compatible(self.encodings[0])
+        self._fast_executemany = options.get('FAST_EXECUTEMANY', False)
+        # apply bulk_update() batches with MERGE instead of CASE expressions
+        self.merge_bulk_update = options.get('MERGE_BULK_UPDATE', True)
+        # set serial primary keys on bulk_create() objects, which locks the table
+        self.return_bulk_serials = options.get('RETURN_BULK_SERIALS', False)
+        # rows per fetchmany() call when no size is given, and when iterating
+        self._fetch_size = options.get('FETCH_SIZE', GET_ITERATOR_CHUNK_SIZE)
+        # close the result set after every fetchone(), as FreeTDS requires
+        self._fetchone_nextset = options.get('FETCHONE_NEXTSET', False)
+        # cursors that may have an open result set left by fetchone()
+        self._pending_results = weakref.WeakSet()
+        self._pool_options = options.get('POOL')
+        self._pool = None
+        self._breaker = None
+        # runs blocking driver calls on a native thread pool under gevent/eventlet
+        self._cooperative = get_runner(options.get('COOPERATIVE'))
+        # session settings known to be in effect on the current connection
+        self._initial_session = {}
+        self._session_state = {}
+        # cursor reused for statements that return no rows
+        self._control_cursor = None
+        statement_cache_size = options.get('STATEMENT_CACHE_SIZE', 0)
+        self._statement_cache = StatementCache(statement_cache_size) if statement_cache_size else None
+        # statements the driver refused to execute with array binding
+        self._array_binding_rejected = set()
         # make lookup operators to be collation-sensitive if needed
         self.collation = options.get('collation', None)
         if self.collation:
@@ -176,22 +285,55 @@ class DatabaseWrapper(BaseDatabaseWrapper):
         """
         This method is invoked at the start of a request to verify an existing
         connection is still functional. This is achieved by doing a simple query
-        against the database.
+        against the database. In lazy mode the check is deferred until the
+        connection is first used, so requests that don't use it skip it.
         """
         if not self._validation_enabled or time.time() < self._next_validation:
             return
 
         self._next_validation = time.time() + self._validation_interval
+        if self._validation_mode == 'lazy':
+            self._validation_pending = True
+            return
+
+        self._validate()
 
+    def _validate(self):
         # We call close_if_unusable_or_obsolete to ensure obsolete connections
         # are closed before we consider validating them. This will result in
         # close_if_unusable_or_obsolete being called twice since it is also
         # called automatically by django. This is ok since the second call is
         # essentially a no-op.
         self.close_if_unusable_or_obsolete()
-        if self.connection is not None and not self.is_usable():
+        if self.connection is None:
+            return
+        start = time.monotonic()
+        usable = self.is_usable()
+        elapsed = time.monotonic() - start
+        stats = self._validation_stats
+        stats['validations'] += 1
+        stats['total_time'] += elapsed
+        stats['last_time'] = elapsed
+        logger.debug(f"validated connection in {elapsed * 1000:.1f} ms")
+        if not usable:
+            stats['failures'] += 1
             self.close()
 
+    def ensure_connection(self):
+        if self._validation_pending:
+            self._validation_pending = False
+            # a connection can't be replaced in the middle of a transaction
+            if not self.in_atomic_block:
+                self._validate()
+        super().ensure_connection()
+
+    def validation_stats(self):
+        """
+        Number of validations and failures, and the time in seconds spent
+        validating the connection in total and on the last validation.
+        """
+        return dict(self._validation_stats)
+
     def get_driver_path(self):
         system = platform.system().upper()
         if system == 'WINDOWS':
@@ -227,6 +369,19 @@ class DatabaseWrapper(BaseDatabaseWrapper):
         return conn_params
 
     def get_new_connection(self, conn_params):
+        if self._pool_options is not None:
+            self._pool = self._get_pool(conn_params)
+            self.connection = self._pool.acquire()
+        else:
+            self.connection = self._open_connection(self._connection_string(conn_params), conn_params)
+        # the database may have changed, e.g. to the test database
+        self.introspection.invalidate_cache()
+        self._control_cursor = None
+        self._initial_session = self._initial_session_state(conn_params['OPTIONS'])
+        self._session_state = dict(self._initial_session)
+        return self.connection
+
+    def _connection_string(self, conn_params):
         parts = [
             'Driver={{{}}}'.format(conn_params['OPTIONS']['DRIVER']),
         ]
@@ -245,16 +400,25 @@ class DatabaseWrapper(BaseDatabaseWrapper):
             parts.append('Pwd={}'.format(conn_params['PASSWORD']))
         if 'CPTIMEOUT' in conn_params['OPTIONS']:
             parts.append('CPTimeout={}'.format(conn_params['OPTIONS']['CPTIMEOUT']))
+        if 'FETCH_BUFFER_SIZE' in conn_params['OPTIONS']:
+            parts.append('FetchBufferSize={}'.format(conn_params['OPTIONS']['FETCH_BUFFER_SIZE']))
+
+        return ';'.join(parts)
 
-        connection_string = ';'.join(parts)
+    def _open_connection(self, connection_string, conn_params):
+        """
+        Open a new connection and configure it. This may run on behalf of
+        another thread's wrapper when the connection is opened for the pool,
+        so it must only touch the new connection.
+        """
         logging.debug('Connecting to Informix')
-        self.connection = self._get_connection_with_retries(connection_string, conn_params)
-        self.connection.setencoding(encoding='UTF-8')
+        connection = self._get_connection_with_retries(connection_string, conn_params)
+        connection.setencoding(encoding='UTF-8')
 
         # This will set database isolation level at connection level
         if 'ISOLATION_LEVEL' in conn_params['OPTIONS']:
-            self.connection.set_attr(pyodbc.SQL_ATTR_TXN_ISOLATION,
-                                     self.ISOLATION_LEVEL[conn_params['OPTIONS']['ISOLATION_LEVEL']])
+            connection.set_attr(pyodbc.SQL_ATTR_TXN_ISOLATION,
+                                self.ISOLATION_LEVEL[conn_params['OPTIONS']['ISOLATION_LEVEL']])
 
         # This will set SQL_C_CHAR, SQL_C_WCHAR and SQL_BINARY to 32000
         # this max length is actually just what the database internally
@@ -262,22 +426,43 @@ class DatabaseWrapper(BaseDatabaseWrapper):
         # 32000, you would need to split anything bigger over multiple fields
         # This limit will not effect schema defined lengths, which will just
         # truncate values greater than the limit.
-        self.connection.maxwrite = 32000
+        connection.maxwrite = 32000
 
-        self.connection.add_output_converter(-101, lambda r: r.decode('utf-8'))  # Constraints
-        self.connection.add_output_converter(-391, lambda r: r.decode('utf-16-be'))  # Integrity Error
+        connection.add_output_converter(-101, lambda r: r.decode('utf-8'))  # Constraints
+        connection.add_output_converter(-391, lambda r: r.decode('utf-16-be'))  # Integrity Error
 
-        self.connection.add_output_converter(pyodbc.SQL_CHAR, self._output_converter)
-        self.connection.add_output_converter(pyodbc.SQL_WCHAR, self._output_converter)
-        self.connection.add_output_converter(pyodbc.SQL_VARCHAR, self._output_converter)
-        self.connection.add_output_converter(pyodbc.SQL_WVARCHAR, self._output_converter)
-        self.connection.add_output_converter(pyodbc.SQL_LONGVARCHAR, self._output_converter)
-        self.connection.add_output_converter(pyodbc.SQL_WLONGVARCHAR, self._output_converter)
+        connection.add_output_converter(pyodbc.SQL_CHAR, self._output_converter)
+        connection.add_output_converter(pyodbc.SQL_WCHAR, self._output_converter)
+        connection.add_output_converter(pyodbc.SQL_VARCHAR, self._output_converter)
+        connection.add_output_converter(pyodbc.SQL_WVARCHAR, self._output_converter)
+        connection.add_output_converter(pyodbc.SQL_LONGVARCHAR, self._output_converter)
+        connection.add_output_converter(pyodbc.SQL_WLONGVARCHAR, self._output_converter)
 
         if 'LOCK_MODE_WAIT' in conn_params['OPTIONS']:
-            self.set_lock_mode(wait=conn_params['OPTIONS']['LOCK_MODE_WAIT'])
+            cursor = connection.cursor()
+            try:
+                self._driver_call(cursor.execute, self._lock_mode_sql(conn_params['OPTIONS']['LOCK_MODE_WAIT']))
+            finally:
+                cursor.close()
 
-        return self.connection
+        return connection
+
+    def _get_pool(self, conn_params):
+        """
+        The process-wide pool for this database alias; see the POOL option.
+        """
+        options = self._pool_options
+        return get_pool(
+            self.alias,
+            functools.partial(self._open_connection, self._connection_string(conn_params), conn_params),
+            min_size=options.get('MIN_SIZE', 0),
+            max_size=options.get('MAX_SIZE', 10),
+            max_idle=options.get('MAX_IDLE', 300),
+            max_lifetime=options.get('MAX_LIFETIME', 3600),
+            timeout=options.get('TIMEOUT', 30),
+            check=self._is_usable_connection if options.get('HEALTH_CHECK', True) else None,
+            run=self._cooperative,
+        )
 
     def _get_connection_with_retries(self, connection_string, conn_params):
         """
@@ -291,15 +476,23 @@ class DatabaseWrapper(BaseDatabaseWrapper):
         exp_base = retry_params.get("WAIT_EXP_BASE", 2)
         errors_to_retry = retry_params.get("ERRORS", ["-908", "-930", "-27001"])
         retryable = re.compile(r"\((" + "|".join(errors_to_retry) + r")\)")
+        breaker = self._get_breaker(conn_params, retryable)
+
+        def connect():
+            return self._driver_call(functools.partial(
+                pyodbc.connect, connection_string, autocommit=conn_params["AUTOCOMMIT"],
+                timeout=conn_params["OPTIONS"].get("CONN_TIMEOUT", 0),
+            ))
 
         attempt = 0
         while True:
             attempt += 1
             try:
-                conn = pyodbc.connect(connection_string, autocommit=conn_params["AUTOCOMMIT"],
-                                      timeout=conn_params["OPTIONS"].get("CONN_TIMEOUT", 0))
+                conn = breaker.call(connect) if breaker is not None else connect()
             except pyodbc.Error as err:
-                if attempt < max_attempts and retryable.search(err.args[1]):
+                # once the breaker is open, further attempts would be rejected
+                breaker_open = breaker is not None and breaker.state == OPEN
+                if attempt < max_attempts and retryable.search(err.args[1]) and not breaker_open:
                     wait = random.uniform(
                         wait_min,
                         max(wait_min, min(wait_max, multiplier * exp_base ** (attempt - 1))),
@@ -315,6 +508,95 @@ class DatabaseWrapper(BaseDatabaseWrapper):
             else:
                 return conn
 
+    def _get_breaker(self, conn_params, retryable):
+        """
+        The process-wide circuit breaker for this database alias, or None if
+        the CIRCUIT_BREAKER setting is not set. Only errors that would be
+        retried count as failures.
+        """
+        breaker_params = conn_params.get("CIRCUIT_BREAKER")
+        if breaker_params is None:
+            return None
+        self._breaker = get_breaker(
+            self.alias,
+            failure_threshold=breaker_params.get("FAILURE_THRESHOLD", 5),
+            reset_timeout=breaker_params.get("RESET_TIMEOUT", 30),
+            is_failure=lambda err: isinstance(err, pyodbc.Error) and bool(retryable.search(str(err))),
+        )
+        return self._breaker
+
+    def circuit_breaker_stats(self):
+        """
+        State and counters of the circuit breaker, or None if the
+        CIRCUIT_BREAKER setting is not set or no connection was attempted yet.
+        """
+        return self._breaker.stats() if self._breaker is not None else None
+
+    def get_input_sizes(self, fields, force=False):
+        """
+        Return the parameter types to bind for the given model fields when
+        executemany() uses array binding, or None if array binding is disabled
+        (and not `force`d) or one of the columns cannot be bound as an array
+        (e.g. BLOB).
+        """
+        if not self._fast_executemany and not force:
+            return None
+
+        sizes = []
+        for field in fields:
+            db_type = field.db_type(self)
+            if db_type is None:
+                sizes.append(None)
+                continue
+            type_name, _, length = db_type.partition('(')
+            type_name = type_name.strip().lower()
+            length = length.rstrip(')').strip()
+            if type_name in self.array_unbindable_types:
+                return None
+            sql_type = self.input_size_types.get(type_name)
+            if sql_type is None or (length and not length.isdigit()):
+                # e.g. "lvarchar(None)" for a TextField: let the driver size it
+                sizes.append(None)
+            elif type_name == 'decimal':
+                sizes.append((sql_type, field.max_digits, field.decimal_places))
+            elif sql_type == pyodbc.SQL_TYPE_TIMESTAMP:
+                # "yyyy-mm-dd hh:mm:ss.fffff", with the digits of the fraction
+                digits = int(length or 0)
+                sizes.append((sql_type, 20 + digits if digits else 19, digits))
+            elif length:
+                sizes.append((sql_type, int(length), 0))
+            else:
+                sizes.append((sql_type, 0, 0))
+        return sizes
+
+    def prewarm(self, count):
+        """
+        Open connections ahead of the first request and return the time in
+        seconds each took. With the POOL option, up to `count` connections are
+        opened in parallel into the pool; otherwise this thread's connection
+        is opened.
+        """
+        if self._pool_options is None:
+            start = time.monotonic()
+            self.ensure_connection()
+            return [time.monotonic() - start]
+        self._pool = self._get_pool(self.get_connection_params())
+        return self._pool.prewarm(count)
+
+    def pool_stats(self):
+        """
+        Size and counters of the connection pool, or None if the POOL option
+        is not set or no connection has been opened yet.
+        """
+        return self._pool.stats() if self._pool is not None else None
+
+    def statement_cache_stats(self):
+        """
+        Size and hit/miss counters of the statement cache, or None if the
+        STATEMENT_CACHE_SIZE option is not set.
+        """
+        return self._statement_cache.stats() if self._statement_cache is not None else None
+
     def _unescape(self, raw):
         """
         For some reason the Informix ODBC driver seems to double escape new line characters.
@@ -326,46 +608,93 @@ class DatabaseWrapper(BaseDatabaseWrapper):
         return raw.replace(b'\\n', b'\n')
 
     def _output_converter(self, raw):
-        return decoder(self._unescape(raw), self.encodings)
+        # This runs for every character value fetched, so avoid the replace()
+        # copy and the encoding attempts whenever possible.
+        if b'\\' in raw:
+            raw = self._unescape(raw)
+        if self._ascii_fast_path and raw.isascii():
+            return raw.decode('ascii')
+        return decoder(raw, self.encodings)
 
     def init_connection_state(self):
         pass
 
     def create_cursor(self, name=None):
         logging.debug('Creating Informix cursor')
+        if self._statement_cache is not None:
+            # the cursor is taken from the statement cache on execute
+            return CursorWrapper(None, self)
         return CursorWrapper(self.connection.cursor(), self)
 
     def _set_autocommit(self, autocommit):
+        # open result sets must be discarded before changing autocommit mode
+        for cursor in list(self._pending_results):
+            cursor.discard_results()
         with self.wrap_database_errors:
-            self.connection.autocommit = autocommit
+            self._driver_call(setattr, self.connection, 'autocommit', autocommit)
 
     def check_constraints(self, table_names=None):
         """
         To check constraints, we set constraints to immediate. Then, when, we're done we must ensure they
         are returned to deferred.
         """
-        self.cursor().execute('SET CONSTRAINTS ALL IMMEDIATE')
-        self.cursor().execute('SET CONSTRAINTS ALL DEFERRED')
+        self._execute_control('SET CONSTRAINTS ALL IMMEDIATE')
+        self._execute_control('SET CONSTRAINTS ALL DEFERRED')
 
     def _start_transaction_under_autocommit(self):
         """
         Start a transaction explicitly in autocommit mode.
         """
         start_sql = self.ops.start_transaction_sql()
-        self.cursor().execute(start_sql)
+        self._execute_control(start_sql)
+
+    def _execute_control(self, sql):
+        """
+        Execute a statement that returns no rows, such as transaction control
+        or SET statements, on a cursor kept for that purpose instead of
+        allocating a new cursor each time.
+        """
+        self.ensure_connection()
+        with self.wrap_database_errors:
+            self._driver_call(self._get_control_cursor().execute, sql)
+
+    def _driver_call(self, func, *args):
+        """
+        Call a blocking driver function, on the native thread pool in
+        cooperative mode.
+        """
+        if self._cooperative is None:
+            return func(*args)
+        return self._cooperative(func, *args)
+
+    def _get_control_cursor(self):
+        if self._control_cursor is None:
+            self._control_cursor = self.connection.cursor()
+        return self._control_cursor
+
+    def _close_control_cursor(self):
+        cursor, self._control_cursor = self._control_cursor, None
+        if cursor is not None:
+            try:
+                cursor.close()
+            except pyodbc.Error as exc:
+                logger.info(f"error closing cursor: {exc}")
 
     def is_usable(self):
+        return self._is_usable_connection(self.connection)
+
+    def _is_usable_connection(self, connection):
         # We create a cursor and then explicitly close it as there is a bug
         # that is encountered when relying on garbage collection to close the
         # cursor: https://github.com/mkleehammer/pyodbc/issues/585
         try:
-            cursor = self.connection.cursor()
+            cursor = connection.cursor()
         except pyodbc.Error as exc:
             logger.info(f"error creating cursor: {exc}")
             return False
 
         try:
-            cursor.execute(self._validation_query)
+            self._driver_call(cursor.execute, self._validation_query)
             return True
         except pyodbc.Error as exc:
             logger.info(f"error executing query: {exc}")
@@ -383,16 +712,26 @@ class DatabaseWrapper(BaseDatabaseWrapper):
                 return False
 
     def read_dirty(self):
-        self.cursor().execute('set isolation to dirty read;')
+        self.set_isolation('dirty read')
 
     def read_committed(self):
-        self.cursor().execute('set isolation to committed read;')
+        self.set_isolation('committed read')
 
     def read_repeatable(self):
-        self.cursor().execute('set isolation to repeatable read;')
+        self.set_isolation('repeatable read')
 
     def read_committed_with_update_locks(self):
-        self.cursor().execute('set isolation to committed read retain update locks;')
+        self.set_isolation('committed read retain update locks')
+
+    def set_isolation(self, level):
+        """
+        This will set the session isolation level (SET ISOLATION TO <level>),
+        unless the session is known to use that level already.
+        Possible values are in ISOLATION_CLAUSES.
+        """
+        if level not in self.ISOLATION_CLAUSES:
+            raise ValueError('unknown isolation level: {}'.format(level))
+        self._set_session('isolation', level, 'set isolation to {};'.format(level))
 
     def set_lock_mode(self, wait=None):
         """
@@ -405,24 +744,112 @@ class DatabaseWrapper(BaseDatabaseWrapper):
            0 - DO NOT WAIT, end the operation, and return with error.
            nn - WAIT for nn seconds for the lock to be released.
         """
+        if wait is None:
+            raise ValueError('set_lock_mode() requires a wait value')
+        self._set_session('lock_mode_wait', wait, self._lock_mode_sql(wait))
+
+    @contextmanager
+    def session_settings(self, isolation=None, lock_mode_wait=None):
+        """
+        Use the given isolation level and/or lock mode wait for the duration
+        of the block, then restore the previous settings. Only settings that
+        actually change are sent to the server, on entry and on exit.
+        """
+        self.ensure_connection()
+        previous = dict(self._session_state)
+        try:
+            if isolation is not None:
+                self.set_isolation(isolation)
+            if lock_mode_wait is not None:
+                self.set_lock_mode(lock_mode_wait)
+            yield
+        finally:
+            if self.connection is not None:
+                if isolation is not None:
+                    self.set_isolation(previous.get('isolation', self.DEFAULT_SESSION_STATE['isolation']))
+                if lock_mode_wait is not None:
+                    self.set_lock_mode(previous.get('lock_mode_wait', self.DEFAULT_SESSION_STATE['lock_mode_wait']))
+
+    def _set_session(self, setting, value, sql):
+        self.ensure_connection()
+        if setting in self._session_state and self._session_state[setting] == value:
+            return
+        # if the statement fails, the setting is no longer known
+        self._session_state.pop(setting, None)
+        self._execute_control(sql)
+        self._session_state[setting] = value
+
+    def _initial_session_state(self, options):
+        """The session settings a new connection is known to have"""
+        state = {}
+        if 'ISOLATION_LEVEL' in options:
+            state['isolation'] = self.ISOLATION_LEVEL_CLAUSES[options['ISOLATION_LEVEL']]
+        if 'LOCK_MODE_WAIT' in options:
+            state['lock_mode_wait'] = options['LOCK_MODE_WAIT']
+        return state
+
+    def _reset_session(self):
+        """
+        Put the session settings of the connection back to what they were
+        when it was opened, so that it can be reused from the pool. Settings
+        the connection was opened without are put back to the server default,
+        as session_settings() does. Return False if that isn't possible.
+        """
+        statements = []
+        for setting, default in self.DEFAULT_SESSION_STATE.items():
+            if setting not in self._initial_session and setting not in self._session_state:
+                # never changed since the connection was opened
+                continue
+            initial = self._initial_session.get(setting, default)
+            if setting not in self._session_state or self._session_state[setting] != initial:
+                if setting == 'isolation':
+                    statements.append('set isolation to {};'.format(initial))
+                else:
+                    statements.append(self._lock_mode_sql(initial))
+        try:
+            for sql in statements:
+                self._driver_call(self._get_control_cursor().execute, sql)
+        except pyodbc.Error as exc:
+            logger.info(f"error resetting session settings: {exc}")
+            return False
+        return True
+
+    @staticmethod
+    def _lock_mode_sql(wait):
         if wait == 0:
-            sql = 'SET LOCK MODE TO NOT WAIT'
+            return 'SET LOCK MODE TO NOT WAIT'
         elif wait == -1:
-            sql = 'SET LOCK MODE TO WAIT'
+            return 'SET LOCK MODE TO WAIT'
         else:
-            sql = 'SET LOCK MODE TO WAIT {}'.format(wait)
+            return 'SET LOCK MODE TO WAIT {}'.format(wait)
 
-        self.cursor().execute(sql)
+    def _close(self):
+        if self._statement_cache is not None:
+            self._statement_cache.clear()
+        if self.connection is not None and self._pool is not None:
+            with self.wrap_database_errors:
+                # a connection that saw errors may be broken, so don't reuse it
+                discard = self.errors_occurred or not self._reset_session()
+                self._close_control_cursor()
+                return self._pool.release(self.connection, discard=discard)
+        self._close_control_cursor()
+        return super()._close()
 
     def _commit(self):
         if self.connection is not None:
             with self.wrap_database_errors:
-                return self.cursor().execute("COMMIT WORK")
+                if self.connection.autocommit:
+                    # A transaction started with BEGIN WORK under autocommit is
+                    # unknown to the driver, so it has to be ended in SQL.
+                    return self._driver_call(self._get_control_cursor().execute, "COMMIT WORK")
+                return self._driver_call(self.connection.commit)
 
     def _rollback(self):
         if self.connection is not None:
             with self.wrap_database_errors:
-                return self.cursor().execute("ROLLBACK WORK")
+                if self.connection.autocommit:
+                    return self._driver_call(self._get_control_cursor().execute, "ROLLBACK WORK")
+                return self._driver_call(self.connection.rollback)
 
 
 class CursorWrapper(object):
@@ -430,6 +857,11 @@ class CursorWrapper(object):
     A wrapper around the pyodbc's cursor that takes in account a) some pyodbc
     DB-API 2.0 implementation and b) some common ODBC driver particularities.
     """
+    __slots__ = (
+        'active', 'cursor', 'connection', 'driver_charset', 'last_sql', 'last_params', 'input_sizes',
+        'prepared_sql', 'array_binding', '__weakref__',
+    )
+
     def __init__(self, cursor, connection):
         self.active = True
         self.cursor = cursor
@@ -437,11 +869,83 @@ class CursorWrapper(object):
         self.driver_charset = False  # connection.driver_charset
         self.last_sql = ''
         self.last_params = ()
+        self.input_sizes = None
+        # SQL the cursor was taken from the statement cache for, or last ran
+        self.prepared_sql = None
+        # use array binding in executemany() even without FAST_EXECUTEMANY
+        self.array_binding = False
 
     def close(self):
         if self.active:
             self.active = False
-            self.cursor.close()
+            self.connection._pending_results.discard(self)
+            self._release_cursor()
+
+    def discard_results(self):
+        """
+        Close a result set left open by fetchone().
+        """
+        self.connection._pending_results.discard(self)
+        if self.cursor is not None:
+            try:
+                self.cursor.nextset()
+            except pyodbc.Error as exc:
+                logger.info(f"error discarding pending results: {exc}")
+
+    def _release_cursor(self):
+        cursor, self.cursor = self.cursor, None
+        if cursor is None:
+            return
+        if self.prepared_sql is None:
+            cursor.close()
+        elif cursor.connection is self.connection.connection:
+            self.connection._statement_cache.park(self.prepared_sql, cursor)
+        else:
+            # opened on a connection that has since been replaced, e.g. after
+            # a reconnect; parking it would hand it out on the new one
+            try:
+                cursor.close()
+            except pyodbc.Error as exc:
+                logger.info(f"error closing cursor of a previous connection: {exc}")
+
+    def _cursor_for(self, sql):
+        """
+        With the statement cache enabled, switch to a cursor that has `sql`
+        prepared if the connection has one parked. Return True if the cursor
+        came from the cache.
+        """
+        cache = self.connection._statement_cache
+        if cache is None or sql == self.prepared_sql:
+            return False
+        self._release_cursor()
+        self.prepared_sql = None
+        if is_ddl(sql):
+            # DDL invalidates the plans of statements on the altered objects,
+            # and is not worth keeping prepared itself
+            cache.clear()
+            self.cursor = self.connection.connection.cursor()
+            return False
+        self.prepared_sql = sql
+        self.cursor = cache.checkout(sql)
+        if self.cursor is not None:
+            return True
+        self.cursor = self.connection.connection.cursor()
+        return False
+
+    def _retry_stale(self, exc, cached):
+        """
+        A cached statement fails with -710 after another connection altered a
+        table it uses; drop the cache and return True to prepare it again.
+        """
+        if not cached or not is_stale_statement_error(exc):
+            return False
+        logger.info(f"cached statement is stale, preparing it again: {exc}")
+        sql, self.prepared_sql = self.prepared_sql, None
+        self._release_cursor()
+        self.connection._statement_cache.clear()
+        self.cursor = self.connection.connection.cursor()
+        self.prepared_sql = sql
+        return True
 
     def format_sql(self, sql, params):
         if isinstance(sql, str):
@@ -482,28 +986,113 @@ class CursorWrapper(object):
 
         return tuple(fp)
 
+    def format_params_list(self, params_list):
+        """
+        format_params() for the rows of an executemany(). The conversions are
+        worked out once from the types of the first row and applied to every
+        row with the same types; other rows go through format_params().
+        """
+        types = tuple(map(type, params_list[0] or ()))
+        adapters = [
+            (i, adapter) for i, adapter in enumerate(map(self._param_adapter, params_list[0] or ()))
+            if adapter is not None
+        ]
+        formatted = []
+        for params in params_list:
+            if params is None or tuple(map(type, params)) != types:
+                formatted.append(self.format_params(params))
+            elif adapters:
+                params = list(params)
+                for i, adapter in adapters:
+                    params[i] = adapter(params[i])
+                formatted.append(tuple(params))
+            else:
+                formatted.append(tuple(params))
+        return formatted
+
+    def _param_adapter(self, value):
+        """
+        The conversion format_params() applies to parameters like `value`,
+        or None if they are passed as they are.
+        """
+        if isinstance(value, bool):
+            return int
+        if isinstance(value, str) and self.driver_charset:
+            return functools.partial(smart_str, encoding=self.driver_charset)
+        return None
+
     def execute(self, sql, params=None):
         self.last_sql = sql
         sql = self.format_sql(sql, params)
         params = self.format_params(params)
         self.last_params = params
-        return self.cursor.execute(sql, params)
+        self.connection._pending_results.discard(self)
+        cached = self._cursor_for(sql)
+        try:
+            return self.connection._driver_call(self.cursor.execute, sql, params)
+        except pyodbc.Error as exc:
+            if not self._retry_stale(exc, cached):
+                raise
+        return self.connection._driver_call(self.cursor.execute, sql, params)
 
     def executemany(self, sql, params_list=()):
         if not params_list:
             return None
         raw_pll = [p for p in params_list]
         sql = self.format_sql(sql, raw_pll[0])
-        params_list = [self.format_params(p) for p in raw_pll]
-        return self.cursor.executemany(sql, params_list)
+        params_list = self.format_params_list(raw_pll)
+        input_sizes, self.input_sizes = self.input_sizes, None
+        self.connection._pending_results.discard(self)
+        self._cursor_for(sql)
+
+        array_binding = self.connection._fast_executemany or self.array_binding
+        if array_binding and sql not in self.connection._array_binding_rejected:
+            try:
+                return self._fast_executemany(sql, params_list, input_sizes)
+            except pyodbc.Error as exc:
+                # Other errors may come after some rows were inserted, so only
+                # fall back when the driver refused the parameter array (e.g.
+                # for LVARCHAR or BLOB columns); remember that and send the
+                # rows one by one.
+                if not is_array_binding_unsupported(exc):
+                    raise
+                logger.info(f'array binding failed, falling back to row-wise executemany: "{exc}"')
+                self.connection._array_binding_rejected.add(sql)
+
+        return self.connection._driver_call(self.cursor.executemany, sql, params_list)
+
+    def _fast_executemany(self, sql, params_list, input_sizes):
+        self.cursor.fast_executemany = True
+        if input_sizes:
+            self.cursor.setinputsizes(input_sizes)
+        try:
+            return self.connection._driver_call(self.cursor.executemany, sql, params_list)
+        finally:
+            self.cursor.fast_executemany = False
+            if input_sizes:
+                self.cursor.setinputsizes(None)
+
+    def setinputsizes(self, sizes):
+        """
+        Parameter types to bind on the next executemany() when it uses array
+        binding; see DatabaseWrapper.get_input_sizes().
+        """
+        self.input_sizes = sizes
 
     def format_rows(self, rows):
+        """
+        Decode data coming from the database if needed and convert rows to
+        tuples. pyodbc Rows never compare equal to tuples and are not
+        hashable, and Django only converts them itself for queries with
+        converters.
+        """
+        if not self.driver_charset:
+            return list(map(tuple, rows))
         return list(map(self.format_row, rows))
 
     def format_row(self, row):
         """
-        Decode data coming from the database if needed and convert rows to tuples
-        (pyodbc Rows are not sliceable).
+        Decode data coming from the database if needed and convert rows to tuples.
         """
         if self.driver_charset:
             for i in range(len(row)):
@@ -515,27 +1104,64 @@ class CursorWrapper(object):
         return tuple(row)
 
     def fetchone(self):
-        row = self.cursor.fetchone()
-        if row is not None:
-            row = self.format_row(row)
-        # Any remaining rows in the current set must be discarded
-        # before changing autocommit mode when you use FreeTDS
-        self.cursor.nextset()
-        return row
+        row = self.connection._driver_call(self.cursor.fetchone)
+        if row is None:
+            # the driver closes the result set once it is exhausted
+            self.connection._pending_results.discard(self)
+            return row
+        if self.connection._fetchone_nextset:
+            # Any remaining rows in the current set must be discarded
+            # before changing autocommit mode when you use FreeTDS
+            self.cursor.nextset()
+        else:
+            self.connection._pending_results.add(self)
+        return self.format_row(row)
 
-    def fetchmany(self, chunk):
-        return self.format_rows(self.cursor.fetchmany(chunk))
+    def fetchmany(self, size=None):
+        if size is None:
+            size = self.connection._fetch_size
+        return self.format_rows(self.connection._driver_call(self.cursor.fetchmany, size))
 
     def fetchall(self):
-        return self.format_rows(self.cursor.fetchall())
+        self.connection._pending_results.discard(self)
+        return self.format_rows(self.connection._driver_call(self.cursor.fetchall))
+
+    def _get_cursor(self):
+        if self.cursor is None and self.active:
+            # nothing executed yet with the statement cache enabled
+            self.cursor = self.connection.connection.cursor()
+        return self.cursor
+
+    @property
+    def description(self):
+        return self._get_cursor().description
+
+    @property
+    def rowcount(self):
+        return self._get_cursor().rowcount
+
+    @property
+    def arraysize(self):
+        return self._get_cursor().arraysize
+
+    @arraysize.setter
+    def arraysize(self, size):
+        self._get_cursor().arraysize = size
 
     def __getattr__(self, attr):
-        if attr in self.__dict__:
-            return self.__dict__[attr]
-        return getattr(self.cursor, attr)
+        return getattr(self._get_cursor(), attr)
 
     def __iter__(self):
-        return iter(self.cursor)
+        """
+        Stream the rows, fetching FETCH_SIZE rows at a time, so memory use
+        does not grow with the size of the result.
+        """
+        size = self.connection._fetch_size
+        while True:
+            rows = self.connection._driver_call(self.cursor.fetchmany, size)
+            if not rows:
+                return
+            yield from self.format_rows(rows)
 
 
 def _validate_connection(**kwargs):
@@ -545,3 +1171,24 @@ def _validate_connection(**kwargs):
 
 
 signals.request_started.connect(_validate_connection)
+
+
+def prewarm_connections():
+    """
+    Open connections for every Informix database that sets the PREWARM
+    option, e.g. from a gunicorn post_fork hook. Return the connect times in
+    seconds for each database alias.
+    """
+    timings = {}
+    for conn in connections.all():
+        if not isinstance(conn, DatabaseWrapper):
+            continue
+        count = conn.settings_dict.get('OPTIONS', {}).get('PREWARM')
+        if not count:
+            continue
+        timings[conn.alias] = conn.prewarm(count)
+        logger.info(
+            f"prewarmed {len(timings[conn.alias])} connection(s) for '{conn.alias}' in "
+            + ", ".join(f"{t * 1000:.0f} ms" for t in timings[conn.alias])
+        )
+    return timings
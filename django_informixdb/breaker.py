@@ -0,0 +1,138 @@
+"""
+Process-wide circuit breaker for opening connections.
+
+When the database server is down, every thread trying to connect would
+otherwise retry with its own backoff. Once enough attempts in a row have
+failed, the breaker opens and rejects connection attempts straight away for
+a cool-down period; after that a single probe attempt is let through, which
+closes the breaker again if it succeeds.
+"""
+import logging
+import os
+import threading
+import time
+
+import pyodbc
+
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+class CircuitBreaker(object):
+    """
+    A thread-safe circuit breaker.
+
+    Exceptions for which `is_failure` returns False, such as authentication
+    errors, show that the server is reachable and count as successes.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30, is_failure=None):
+        if failure_threshold < 1:
+            raise ValueError('invalid failure threshold: {}'.format(failure_threshold))
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.is_failure = is_failure
+        self.pid = os.getpid()
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        # consecutive failures while closed
+        self._failures = 0
+        self._opened_at = None
+        self._counters = {
+            'opened': 0,
+            'rejected': 0,
+            'probes': 0,
+        }
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+
+    def call(self, func):
+        """
+        Call `func` unless the breaker is open, in which case a
+        pyodbc.OperationalError is raised without calling it.
+        """
+        self._before_call()
+        try:
+            result = func()
+        except Exception as exc:
+            if self.is_failure is None or self.is_failure(exc):
+                self._on_failure()
+            else:
+                self._on_success()
+            raise
+        except BaseException:
+            # e.g. KeyboardInterrupt or a greenlet being killed, which say
+            # nothing about the server
+            self._on_interrupted()
+            raise
+        self._on_success()
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                'state': self._state,
+                'failures': self._failures,
+                **self._counters,
+            }
+
+    def _before_call(self):
+        with self._lock:
+            if self._state == CLOSED:
+                return
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                # let this call through as the probe
+                self._state = HALF_OPEN
+                self._counters['probes'] += 1
+                return
+            self._counters['rejected'] += 1
+        raise pyodbc.OperationalError(
+            '08001', 'Not connecting: circuit breaker is open after {} failed attempts'.format(self.failure_threshold)
+        )
+
+    def _on_success(self):
+        with self._lock:
+            if self._state != CLOSED:
+                logger.info("circuit breaker closed")
+            self._state = CLOSED
+            self._failures = 0
+
+    def _on_interrupted(self):
+        with self._lock:
+            if self._state == HALF_OPEN:
+                # open again as before the probe, so that the next call probes
+                self._state = OPEN
+
+    def _on_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state == CLOSED:
+                    self._counters['opened'] += 1
+                    logger.warning(f"circuit breaker opened after {self._failures} failed attempts")
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(key, **kwargs):
+    """
+    Return the process-wide circuit breaker registered under `key`, creating
+    it with the given settings if needed.
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(key)
+        if breaker is None or breaker.pid != os.getpid():
+            breaker = _breakers[key] = CircuitBreaker(**kwargs)
+        return breaker
@@ -1,10 +1,78 @@
+import functools
+import re
+from contextlib import contextmanager
+from itertools import groupby
+from operator import itemgetter
+
+from django.db import NotSupportedError
 from django.db.models.sql import compiler
-from django.db.models import Value
+from django.db.models import Case, IntegerField, Value
+from django.db.models.lookups import Exact, In
 import django
 
 
 IS_DJANGO_V4 = django.VERSION >= (4, 0)
 
+# quoted strings, then the tokens rewritten outside of them
+_SQL_TOKEN_RE = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|%%|%s|\bSELECT\b")
+_SELECT_RE = re.compile(r"\bSELECT\b")
+
+# longer statements (e.g. wide __in lists) are unlikely to repeat and
+# would make the cache hold on to a lot of memory
+MAX_CACHED_SQL_LENGTH = 16384
+
+# session temp table holding the rows of a MERGE
+MERGE_SOURCE_TABLE = 'django_merge_source'
+
+# merge source column numbering the rows of a bulk insert
+ROW_NUMBER_FIELD = IntegerField()
+ROW_NUMBER_FIELD.set_attributes_from_name('django_row')
+
+
+def _rewrite_sql(sql):
+    """
+    Convert a Django SQL template to the driver's paramstyle: %s becomes ?
+    and %% becomes %, leaving %s inside quoted strings alone. Return the SQL
+    and the offset just after its first SELECT keyword, or None.
+    """
+    if "'" not in sql and '"' not in sql and '%%' not in sql:
+        sql = sql.replace('%s', '?')
+        select = _SELECT_RE.search(sql)
+        return sql, select.end() if select else None
+
+    parts = []
+    length = 0
+    pos = 0
+    select_end = None
+    for match in _SQL_TOKEN_RE.finditer(sql):
+        token = match.group()
+        if token == '%s':
+            token = '?'
+        elif token == 'SELECT':
+            if select_end is None:
+                select_end = length + match.start() - pos + len(token)
+        else:
+            token = token.replace('%%', '%')
+        parts.append(sql[pos:match.start()])
+        parts.append(token)
+        length += match.start() - pos + len(token)
+        pos = match.end()
+    parts.append(sql[pos:])
+    return ''.join(parts), select_end
+
+
+_cached_rewrite_sql = functools.lru_cache(maxsize=1024)(_rewrite_sql)
+
+
+def rewrite_sql(sql):
+    if len(sql) > MAX_CACHED_SQL_LENGTH:
+        return _rewrite_sql(sql)
+    return _cached_rewrite_sql(sql)
+
+
+def _to_qmark(sql):
+    return rewrite_sql(sql)[0]
+
 
 class SQLCompiler(compiler.SQLCompiler):
     def get_select(self, with_col_aliases=False):
@@ -20,46 +88,321 @@ class SQLCompiler(compiler.SQLCompiler):
             sql = node.value, []
         return node, sql, params
 
+    def apply_converters(self, rows, converters):
+        """
+        Like Django's, but skip the converters marked with passthrough() for
+        values of the types they pass through unchanged. The driver already
+        returns dates, times, booleans and such with their Python type, so
+        most converter calls are avoided.
+        """
+        connection = self.connection
+        converters = [
+            (pos, [(getattr(converter, 'passthrough_types', ()), converter) for converter in convs], expression)
+            for pos, (convs, expression) in converters.items()
+        ]
+        for row in map(list, rows):
+            for pos, convs, expression in converters:
+                value = row[pos]
+                for types, converter in convs:
+                    if type(value) not in types:
+                        value = converter(value, expression, connection)
+                row[pos] = value
+            yield row
+
     def as_sql(self, with_limits=True, with_col_aliases=False):
         raw_sql, fields = super(SQLCompiler, self).as_sql(False, with_col_aliases)
+        sql, select_end = rewrite_sql(raw_sql)
 
         # special dialect to return first n rows
-        if with_limits:
-            if self.query.high_mark is not None:
-                _select = "SELECT"
-                _first = self.query.high_mark
-                if self.query.low_mark:
-                    _select += " SKIP %s" % self.query.low_mark
-                    _first -= self.query.low_mark
-                _select += " FIRST %s" % _first
-                raw_sql = raw_sql.replace("SELECT", _select, 1)
+        if with_limits and self.query.high_mark is not None and select_end is not None:
+            _limits = ""
+            _first = self.query.high_mark
+            if self.query.low_mark:
+                _limits += " SKIP %s" % self.query.low_mark
+                _first -= self.query.low_mark
+            _limits += " FIRST %s" % _first
+            sql = sql[:select_end] + _limits + sql[select_end:]
 
-        return raw_sql.replace(r'%s', '?'), fields
+        return sql, fields
 
 
 def _list2tuple(arg):
     return tuple(arg) if isinstance(arg, list) else arg
 
 
+def _on_conflict(query):
+    """
+    'ignore' or 'update' if rows of an insert that conflict with existing ones
+    are to be ignored or to update them, else None.
+    """
+    on_conflict = getattr(query, 'on_conflict', None)
+    if on_conflict is not None:
+        return on_conflict.value
+    # before Django 4.1
+    return 'ignore' if getattr(query, 'ignore_conflicts', False) else None
+
+
+def _column(opts, field):
+    # bulk_create() passes field names instead of fields before Django 4.2
+    if isinstance(field, str):
+        field = opts.pk if field == 'pk' else opts.get_field(field)
+    return field.column
+
+
+@contextmanager
+def array_binding(cursor):
+    """
+    Bind the parameter sets of executemany() calls on `cursor` as arrays,
+    sending a batch in one driver call instead of one per row, whether or
+    not FAST_EXECUTEMANY is set.
+    """
+    cursor.cursor.array_binding = True
+    try:
+        yield
+    finally:
+        cursor.cursor.array_binding = False
+
+
+@contextmanager
+def merge_source(cursor, connection, fields, rows):
+    """
+    Load `rows`, with a value per field of `fields`, into a session temp
+    table to MERGE from. Yield the name of the table, and drop it afterwards.
+    """
+    qn = connection.ops.quote_name
+    table = qn(MERGE_SOURCE_TABLE)
+    cursor.execute('CREATE TEMP TABLE %s (%s) WITH NO LOG' % (
+        table, ', '.join('%s %s' % (qn(field.column), field.rel_db_type(connection)) for field in fields),
+    ))
+    try:
+        input_sizes = connection.get_input_sizes(fields, force=True)
+        sql = 'INSERT INTO %s VALUES (%s)' % (table, ', '.join('?' * len(fields)))
+        if input_sizes is None:
+            cursor.executemany(sql, rows)
+        else:
+            with array_binding(cursor):
+                cursor.setinputsizes(input_sizes)
+                cursor.executemany(sql, rows)
+        yield MERGE_SOURCE_TABLE
+    finally:
+        cursor.execute('DROP TABLE %s' % table)
+
+
 class SQLInsertCompiler(compiler.SQLInsertCompiler, SQLCompiler):
     def as_sql(self):
         result = super(SQLInsertCompiler, self).as_sql()
-        return [(ret[0].replace(r'%s', '?'), _list2tuple(ret[1])) for ret in result]
+        return [(_to_qmark(ret[0]), _list2tuple(ret[1])) for ret in result]
+
+    def execute_sql(self, returning_fields=None):
+        """
+        Informix has no multi-row VALUES clause, so rows sharing the same
+        single-row statement are sent together as parameter sets of one
+        executemany() call bound as arrays, i.e. one driver round trip per
+        batch instead of one per row.
+
+        With RETURN_BULK_SERIALS, serial primary keys of a batch are recovered
+        from the last serial value, which requires the batch to get
+        consecutive serials: the table is locked in share mode for the rest of
+        the transaction so that no other session can insert in between.
+        """
+        on_conflict = _on_conflict(self.query)
+        if on_conflict is not None:
+            keys = self._conflict_keys(on_conflict)
+            # without unique columns to conflict on, this is a plain insert
+            if keys:
+                return self._execute_merge(on_conflict, keys, returning_fields)
+        if len(self.query.objs) < 2:
+            return super(SQLInsertCompiler, self).execute_sql(returning_fields)
+        if returning_fields and not self._can_return_serials(returning_fields):
+            return self._execute_sql_per_row(returning_fields)
+
+        self.returning_fields = returning_fields
+        opts = self.query.get_meta()
+        with self.connection.cursor() as cursor:
+            if not returning_fields:
+                self._execute_bulk(cursor)
+                return []
+            if opts.pk in self.query.fields:
+                self._execute_bulk(cursor)
+                return [(getattr(obj, opts.pk.attname),) for obj in self.query.objs]
+
+            cursor.execute('LOCK TABLE %s IN SHARE MODE' % self.connection.ops.quote_name(opts.db_table))
+            self._execute_bulk(cursor)
+            serials = self.connection.ops.last_insert_ids(cursor, opts.db_table, opts.pk, len(self.query.objs))
+        return [(serial,) for serial in serials]
+
+    def _execute_bulk(self, cursor):
+        # None if a column (e.g. BLOB) can't be bound as an array
+        input_sizes = self.connection.get_input_sizes(self.query.fields, force=True)
+        for sql, rows in groupby(self.as_sql(), key=itemgetter(0)):
+            param_rows = [params for _, params in rows]
+            if input_sizes is None:
+                cursor.executemany(sql, param_rows)
+                continue
+            with array_binding(cursor):
+                # Expressions change the number of parameters per field, in
+                # which case the driver has to describe the parameters itself.
+                if len(param_rows[0]) == len(input_sizes):
+                    cursor.setinputsizes(input_sizes)
+                cursor.executemany(sql, param_rows)
+
+    def _can_return_serials(self, returning_fields):
+        pk = self.query.get_meta().pk
+        return (
+            self.connection.return_bulk_serials
+            and list(returning_fields) == [pk]
+            and pk.get_internal_type() in ('AutoField', 'BigAutoField')
+            # the table lock is only released at the end of a transaction
+            and self.connection.in_atomic_block
+        )
+
+    def _conflict_keys(self, on_conflict):
+        """
+        Column lists of the unique keys on which rows being inserted can
+        conflict with existing rows: the unique fields given to bulk_create()
+        to update conflicts, or to ignore conflicts, every unique key whose
+        columns are all inserted.
+        """
+        opts = self.query.get_meta()
+        if on_conflict == 'update':
+            return [[_column(opts, field) for field in self.query.unique_fields]]
+        columns = {field.name: field.column for field in self.query.fields}
+        candidates = [(field.name,) for field in self.query.fields if field.unique]
+        candidates += [tuple(names) for names in opts.unique_together]
+        candidates += [tuple(constraint.fields) for constraint in opts.total_unique_constraints]
+        keys = []
+        for names in candidates:
+            key = [columns[name] for name in names if name in columns]
+            if names and len(key) == len(names) and key not in keys:
+                keys.append(key)
+        return keys
+
+    def _execute_merge(self, on_conflict, keys, returning_fields):
+        """
+        Informix has no INSERT ... ON CONFLICT, so the rows are loaded into a
+        temp table and merged into the table: rows matching an existing row on
+        any of `keys` are skipped, or update its `update_fields` when updating
+        conflicts, and the others are inserted.
+        """
+        opts = self.query.get_meta()
+        fields = self.query.fields
+        value_rows = [
+            [self.prepare_value(field, self.pre_save_val(field, obj)) for field in fields]
+            for obj in self.query.objs
+        ]
+        placeholder_rows, param_rows = self.assemble_as_sql(fields, value_rows)
+        if any(placeholder != '%s' for row in placeholder_rows for placeholder in row):
+            raise NotSupportedError('Informix cannot insert values of expressions when handling conflicts.')
+        update_columns = [_column(opts, field) for field in self.query.update_fields] if on_conflict == 'update' else ()
+
+        self.returning_fields = returning_fields
+        ops = self.connection.ops
+        rows = [(i,) + tuple(params) for i, params in enumerate(param_rows)]
+        with self.connection.cursor() as cursor:
+            with merge_source(cursor, self.connection, [ROW_NUMBER_FIELD] + fields, rows) as source:
+                cursor.execute(ops.merge_sql(
+                    opts.db_table, source, keys, update_columns=update_columns,
+                    insert_columns=[field.column for field in fields],
+                ))
+                if not returning_fields:
+                    return []
+                # the rows of the table now matching each row inserted
+                cursor.execute('SELECT %s FROM %s s JOIN %s t ON %s ORDER BY s.%s' % (
+                    ', '.join('t.%s' % ops.quote_name(field.column) for field in returning_fields),
+                    ops.quote_name(source), ops.quote_name(opts.db_table), ops.merge_condition_sql(keys),
+                    ops.quote_name(ROW_NUMBER_FIELD.column),
+                ))
+                return [tuple(row) for row in cursor.fetchall()]
+
+    def _execute_sql_per_row(self, returning_fields):
+        objs, rows = self.query.objs, []
+        try:
+            for obj in objs:
+                self.query.objs = [obj]
+                rows.extend(super(SQLInsertCompiler, self).execute_sql(returning_fields))
+        finally:
+            self.query.objs = objs
+        return rows
 
 
 class SQLAggregateCompiler(compiler.SQLAggregateCompiler, SQLCompiler):
     def as_sql(self):
         result = super(SQLAggregateCompiler, self).as_sql()
-        return result[0].replace(r'%s', '?'), result[1]
+        return _to_qmark(result[0]), result[1]
 
 
 class SQLDeleteCompiler(compiler.SQLDeleteCompiler, SQLCompiler):
     def as_sql(self):
         result = super(SQLDeleteCompiler, self).as_sql()
-        return result[0].replace(r'%s', '?'), result[1]
+        return _to_qmark(result[0]), result[1]
 
 
 class SQLUpdateCompiler(compiler.SQLUpdateCompiler, SQLCompiler):
     def as_sql(self):
         result = super(SQLUpdateCompiler, self).as_sql()
-        return result[0].replace(r'%s', '?'), result[1]
+        return _to_qmark(result[0]), result[1]
+
+    def execute_sql(self, result_type):
+        """
+        QuerySet.bulk_update() sets every field to a CASE with a WHEN per
+        row, which makes statements that grow with the batch and are slow
+        for the server to evaluate. Such updates are applied instead by
+        loading the new values into a temp table with executemany(), and
+        merging that into the table with a single MERGE.
+        """
+        rows = self._bulk_update_rows() if self.connection.merge_bulk_update else None
+        if rows is None:
+            return super(SQLUpdateCompiler, self).execute_sql(result_type)
+
+        opts = self.query.get_meta()
+        fields = [field for field, _, _ in self.query.values]
+        with self.connection.cursor() as cursor:
+            with merge_source(cursor, self.connection, [opts.pk] + fields, rows) as source:
+                cursor.execute(self.connection.ops.merge_sql(
+                    opts.db_table, source, [[opts.pk.column]], update_columns=[field.column for field in fields],
+                ))
+                return cursor.rowcount
+
+    def _bulk_update_rows(self):
+        """
+        Return the rows (pk, value, ...) of an update shaped like the ones
+        QuerySet.bulk_update() makes, i.e. filtered on pk__in only and setting
+        each field to CASE WHEN pk = ... THEN <value> for every pk of the
+        filter, or None for any other update. The CASE expressions are
+        already resolved, so their conditions are lookups.
+        """
+        query = self.query
+        pk = query.get_meta().pk
+        where = query.where
+        if not query.values or query.related_updates or where.negated or len(where.children) != 1:
+            return None
+        lookup = where.children[0]
+        if not isinstance(lookup, In) or getattr(lookup.lhs, 'target', None) != pk or \
+                not isinstance(lookup.rhs, (list, tuple)):
+            return None
+
+        pks = set(lookup.rhs)
+        columns = []
+        for field, _, case in query.values:
+            if not isinstance(case, Case) or not isinstance(case.default, Value) or case.default.value is not None:
+                return None
+            if hasattr(field, 'get_placeholder'):
+                return None
+            values = {}
+            for when in case.cases:
+                condition = when.condition
+                if condition.negated or len(condition.children) != 1 or not isinstance(when.result, Value):
+                    return None
+                pk_lookup = condition.children[0]
+                if not isinstance(pk_lookup, Exact) or getattr(pk_lookup.lhs, 'target', None) != pk:
+                    return None
+                # the first WHEN for a pk is the one CASE applies
+                values.setdefault(pk_lookup.rhs, field.get_db_prep_save(when.result.value, connection=self.connection))
+            if values.keys() != pks:
+                return None
+            columns.append(values)
+        return [
+            (pk.get_db_prep_value(pk_value, self.connection, prepared=True),)
+            + tuple(values[pk_value] for values in columns)
+            for pk_value in columns[0]
+        ]
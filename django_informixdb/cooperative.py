@@ -0,0 +1,36 @@
+"""
+Cooperative mode for gevent and eventlet workers.
+
+pyodbc calls block the calling native thread, which under gevent or eventlet
+is the thread running every greenlet of the worker. In cooperative mode the
+driver calls run on the library's native thread pool instead, and the
+calling greenlet yields to the hub until they finish. pyodbc releases the
+GIL while it waits for the server, so other greenlets keep running.
+"""
+from django.core.exceptions import ImproperlyConfigured
+
+
+def get_runner(mode):
+    """
+    Return a function `run(func, *args)` that calls `func(*args)` on the
+    thread pool of the given library ('gevent' or 'eventlet'), or None if
+    `mode` is None.
+    """
+    if mode is None:
+        return None
+    if mode == 'gevent':
+        try:
+            import gevent
+        except ImportError as e:
+            raise ImproperlyConfigured("COOPERATIVE is 'gevent' but gevent cannot be imported: {}".format(e))
+
+        def run(func, *args):
+            return gevent.get_hub().threadpool.apply(func, args)
+        return run
+    if mode == 'eventlet':
+        try:
+            from eventlet import tpool
+        except ImportError as e:
+            raise ImproperlyConfigured("COOPERATIVE is 'eventlet' but eventlet cannot be imported: {}".format(e))
+        return tpool.execute
+    raise ImproperlyConfigured("COOPERATIVE must be 'gevent' or 'eventlet', not {!r}".format(mode))
@@ -0,0 +1,122 @@
+"""
+Run ORM code for an Informix database from asyncio without serialising it.
+
+Django's async ORM hands every query to asgiref's single shared thread, so
+one event loop can only have one Informix query in flight. An AsyncExecutor
+runs them on a bounded set of worker threads instead. Each worker is a
+single thread with its own connection, so a worker runs one job at a time
+and a query and the fetches of its results always use the same connection.
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+class AsyncExecutor(object):
+    """
+    A bounded set of worker threads running database code for the `using`
+    alias. Jobs wait for a free worker when all of them are busy.
+
+        executor = AsyncExecutor(max_workers=8)
+        count = await executor.run(Donut.objects.filter(...).count)
+        async for donut in executor.iterate(Donut.objects.all()):
+            ...
+    """
+
+    def __init__(self, using=DEFAULT_DB_ALIAS, max_workers=4):
+        if max_workers < 1:
+            raise ValueError('invalid number of workers: {}'.format(max_workers))
+        self.using = using
+        self.max_workers = max_workers
+        self._workers = [
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix='informix-async-{}'.format(using))
+            for _ in range(max_workers)
+        ]
+        # created in the event loop on first use
+        self._idle = None
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Call `func` on a worker thread and return its result. Afterwards
+        the worker's connection is closed if it is unusable or has outlived
+        CONN_MAX_AGE, as at the end of a request.
+        """
+        worker = await self._acquire()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                worker, functools.partial(self._call, func, *args, **kwargs)
+            )
+        finally:
+            self._release(worker)
+
+    async def iterate(self, queryset, chunk_size=None):
+        """
+        Yield the results of `queryset` as they are fetched, `chunk_size`
+        rows at a time. The query runs on one worker, which is kept for this
+        iteration until it is exhausted or closed.
+        """
+        chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+        loop = asyncio.get_running_loop()
+        worker = await self._acquire()
+        results = queryset.iterator(chunk_size=chunk_size)
+        try:
+            while True:
+                chunk = await loop.run_in_executor(worker, self._next_chunk, results, chunk_size)
+                if not chunk:
+                    return
+                for item in chunk:
+                    yield item
+        finally:
+            try:
+                await loop.run_in_executor(worker, self._close_results, results)
+            finally:
+                self._release(worker)
+
+    def shutdown(self):
+        """
+        Close the workers' connections and stop their threads.
+        """
+        for worker in self._workers:
+            worker.submit(self._close_connection).result()
+            worker.shutdown()
+
+    def stats(self):
+        return {
+            'workers': self.max_workers,
+            'idle': self._idle.qsize() if self._idle is not None else self.max_workers,
+        }
+
+    async def _acquire(self):
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+            for worker in self._workers:
+                self._idle.put_nowait(worker)
+        return await self._idle.get()
+
+    def _release(self, worker):
+        self._idle.put_nowait(worker)
+
+    def _call(self, func, *args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            connections[self.using].close_if_unusable_or_obsolete()
+
+    @staticmethod
+    def _next_chunk(results, chunk_size):
+        return list(islice(results, chunk_size))
+
+    def _close_results(self, results):
+        try:
+            results.close()
+        finally:
+            connections[self.using].close_if_unusable_or_obsolete()
+
+    def _close_connection(self):
+        connections[self.using].close()
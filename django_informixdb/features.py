@@ -3,7 +3,13 @@ from django.db.utils import InterfaceError
 
 
 class DatabaseFeatures(BaseDatabaseFeatures):
+    # Informix has no multi-row VALUES clause; bulk inserts are batched with
+    # executemany() in SQLInsertCompiler.execute_sql instead.
     has_bulk_insert = False
+    # conflicts are handled with MERGE, see SQLInsertCompiler._execute_merge()
+    supports_ignore_conflicts = True
+    supports_update_conflicts = True
+    supports_update_conflicts_with_target = True
     can_use_chunked_reads = True
     supports_microsecond_precision = False
     supports_regex_backreferencing = False
@@ -20,3 +26,8 @@ class DatabaseFeatures(BaseDatabaseFeatures):
     has_select_for_update = True
     supports_select_for_update_with_limit = True
     closed_cursor_error_class = InterfaceError
+
+    @property
+    def can_return_rows_from_bulk_insert(self):
+        # serials of a batch are only consecutive with the table locked
+        return self.connection.return_bulk_serials
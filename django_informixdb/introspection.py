@@ -1,20 +1,44 @@
+import copy
+import time
+from collections import defaultdict, namedtuple
+
 from django.db.backends.base.introspection import BaseDatabaseIntrospection, FieldInfo, TableInfo
 
 from .datatypes import InformixTypes
-from .tableignore import EXCLUDED_TABLES
+
+
+# tables with a lower tabid are the system catalog
+FIRST_USER_TABID = 100
+
+# version of metadata loaded without reading the table's version first
+_UNVERIFIED = object()
+
+TableMetadata = namedtuple('TableMetadata', 'description key_columns indexes relations constraints')
 
 
 class DatabaseIntrospection(BaseDatabaseIntrospection):
     # Map type codes to Django Field types.
     data_types_reverse = InformixTypes.field_map()
 
+    def __init__(self, connection):
+        super().__init__(connection)
+        # seconds a table's systables.version is trusted without reading it
+        # again; None disables the cache
+        options = connection.settings_dict.get('OPTIONS', {})
+        self._cache_ttl = options.get('INTROSPECTION_CACHE_TTL', 60)
+        # {table_name: (version, {kind: value})}
+        self._cache = {}
+        # {table_name: (time read, version)}
+        self._versions = {}
+        self._cache_stats = {
+            'hits': 0,
+            'misses': 0,
+            'invalidations': 0,
+        }
+
     def get_table_list(self, cursor):
-        cursor.execute('SELECT tabname, tabtype FROM systables')
-        # We want to ignore all the internal 'sys' tables in the exclude list
-        return [
-            TableInfo(x[0], x[1].lower()) for x in cursor.fetchall()
-            if x[0] not in EXCLUDED_TABLES
-        ]
+        cursor.execute('SELECT tabname, tabtype FROM systables WHERE tabid >= ?', [FIRST_USER_TABID])
+        return [TableInfo(x[0], x[1].lower()) for x in cursor.fetchall()]
 
     def get_table_description(self, cursor, table_name):
         """Returns a description of the table, with the DB-API cursor.description interface.
@@ -27,108 +51,264 @@ class DatabaseIntrospection(BaseDatabaseIntrospection):
         At present, this driver doesn't support table-specific collation settings, but Django
         requires a collation value in the FieldInfo, so None is used.
         """
-        query_format = """
-            SELECT c.*
-            FROM syscolumns c
-            JOIN systables t
-            ON c.tabid=t.tabid
-            WHERE t.tabname='{}'
-        """
-
-        cursor.execute(query_format.format(table_name))
-        columns = [[c[0], c[3] % 256, None, c[4], c[4], None, 0 if c[3] > 256 else 1, None, None]
-                   for c in cursor.fetchall()]
-        items = []
-        for column in columns:
-            if column[1] in (InformixTypes.SQL_TYPE_NUMERIC.num, InformixTypes.SQL_TYPE_DECIMAL.num):
-                column[4] = int(column[3] / 256)
-                column[5] = column[3] - column[4] * 256
-            items.append(FieldInfo(*column))
-
-        return items
+        return self._cached(cursor, table_name, 'description', lambda: self._table_description(
+            self._load_columns(cursor, [table_name])[table_name],
+        ))
 
     def get_key_columns(self, cursor, table_name):
-        key_columns_query = """
-            SELECT col1.colname AS column_name,
-                   t2.tabname AS referenced_table_name,
-                   col2.colname AS referenced_column
-            FROM systables t1
-            JOIN syscolumns col1 ON t1.tabid = col1.tabid
-            JOIN sysindexes idx1 ON idx1.tabid=t1.tabid AND col1.colno = idx1.part1
-            JOIN sysconstraints const1 ON idx1.idxname = const1.idxname AND const1.tabid = t1.tabid
-            JOIN sysreferences  ref ON ref.constrid = const1.constrid
-            JOIN sysconstraints const2 ON ref.primary = const2.constrid
-            JOIN sysindexes idx2 ON idx2.idxname = const2.idxname
-            JOIN syscolumns col2 ON col2.colno = idx2.part1 AND col2.tabid = idx2.tabid
-            JOIN systables t2 ON t2.tabid = idx2.tabid
-            WHERE const1.constrtype='R' AND t1.tabname ='{}'
-        """
-        cursor.execute(key_columns_query.format(table_name))
-        return cursor.fetchall()
+        return self._cached(cursor, table_name, 'key_columns', lambda: self._key_columns(
+            self._load_references(cursor, [table_name])[table_name],
+        ))
 
     def get_indexes(self, cursor, table_name):
         """ This query retrieves each index ON the given table, including the
             first associated field name """
-        index_query = """
-            SELECT
-                sc.colname, idx.idxtype, scs.constrtype
-            FROM systables st JOIN sysindexes idx  ON st.tabid = idx.tabid
-            JOIN syscolumns sc ON idx.part1=sc.colno AND sc.tabid = st.tabid
-            LEFT JOIN sysconstraints scs ON idx.idxname = scs.idxname
-            WHERE st.tabname='{}' AND idx.part2 = 0
-        """
-        cursor.execute(index_query.format(table_name))
-        indexes = {}
-        for row in cursor.fetchall():
-            indexes[row[0]] = {
-                'primary_key': True if row[2] == 'P' else False,
-                'unique': True if row[1] == 'U' else False
-            }
-        return indexes
-
-    def _get_col_index(self, cursor, table_name):
-        """Private method. Getting Index position of column by its name"""
-        col_query = """
-            SELECT colno, colname FROM syscolumns sc
-            JOIN systables st ON sc.tabid=st.tabid
-            WHERE st.tabname='{}'
-        """
-        cursor.execute(col_query.format(table_name))
-        return {row[1]: int(row[0]) - 1 for row in cursor.fetchall()}
+        return self._cached(cursor, table_name, 'indexes', lambda: self._indexes(
+            self._load_columns(cursor, [table_name])[table_name],
+            self._load_indexes(cursor, [table_name])[table_name],
+        ))
 
     def get_relations(self, cursor, table_name):
         """
         Returns a dictionary of {field_index: (field_index_other_table, other_table)}
         representing all relationships to the given table. Indexes are 0-based.
         """
-        relations = {}
-        key_columns = self.get_key_columns(cursor, table_name)
-        for rel in key_columns:
-            row0 = self._get_col_index(cursor, table_name)[rel[0]]
-            row1 = self._get_col_index(cursor, rel[1])[rel[2]]
-            row2 = rel[1]
-            relations[row0] = (row1, row2)
-        return relations
+        return self._cached(cursor, table_name, 'relations', lambda: self._relations(
+            self._load_references(cursor, [table_name])[table_name],
+        ))
 
     def get_constraints(self, cursor, table_name):
-        constraints = {}
-        index_query = """
-            SELECT idxname, idxtype, indexkeys
+        return self._cached(cursor, table_name, 'constraints', lambda: self._constraints(
+            self._load_columns(cursor, [table_name])[table_name],
+            self._load_indexes(cursor, [table_name])[table_name],
+        ))
+
+    def get_tables_metadata(self, cursor, table_names=None):
+        """
+        Introspect many tables at once, all user tables if `table_names` is
+        None, in one query per system catalog instead of several queries per
+        table. Return a {table_name: TableMetadata} dictionary whose fields
+        are what the get_*() methods return for that table. The results
+        are added to the cache, so that later get_*() calls for these tables
+        don't have to query the catalog.
+        """
+        # read the versions first, so that changes made while the catalog
+        # is being read invalidate the cached results
+        versions = self._load_versions(cursor, table_names)
+        columns = self._load_columns(cursor, table_names)
+        indexes = self._load_indexes(cursor, table_names)
+        references = self._load_references(cursor, table_names)
+        if table_names is None:
+            table_names = list(columns)
+        metadata = {
+            table_name: TableMetadata(
+                description=self._table_description(columns[table_name]),
+                key_columns=self._key_columns(references[table_name]),
+                indexes=self._indexes(columns[table_name], indexes[table_name]),
+                relations=self._relations(references[table_name]),
+                constraints=self._constraints(columns[table_name], indexes[table_name]),
+            )
+            for table_name in table_names
+        }
+        if self._cache_ttl is not None:
+            now = time.monotonic()
+            for table_name, table in metadata.items():
+                if versions.get(table_name) is None:
+                    continue
+                self._versions[table_name] = (now, versions[table_name])
+                self._cache[table_name] = (versions[table_name], copy.deepcopy(table._asdict()))
+        return metadata
+
+    def invalidate_cache(self, table_names=None):
+        """
+        Drop cached metadata for the given tables, or for all tables.
+        """
+        if table_names is None:
+            if self._cache or self._versions:
+                self._cache_stats['invalidations'] += 1
+            self._cache.clear()
+            self._versions.clear()
+            return
+        for table_name in table_names:
+            if self._cache.pop(table_name, None) is not None:
+                self._cache_stats['invalidations'] += 1
+            self._versions.pop(table_name, None)
+
+    def cache_stats(self):
+        """
+        Hit and miss counters of the metadata cache, and its hit rate.
+        """
+        stats = dict(self._cache_stats, tables=len(self._cache))
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else None
+        return stats
+
+    def _cached(self, cursor, table_name, kind, load):
+        """
+        Return the `kind` metadata of a table from the cache if the table is
+        unchanged since it was cached, calling `load` otherwise.
+        """
+        if self._cache_ttl is None:
+            return load()
+        entry = self._cache.get(table_name)
+        if entry is None and self._cache_ttl > 0:
+            # The metadata has to be loaded whatever the version, and would be
+            # trusted for the TTL anyway, so don't read the version first:
+            # e.g. the schema editor clears the cache after every statement.
+            self._cache_stats['misses'] += 1
+            value = load()
+            self._versions[table_name] = (time.monotonic(), _UNVERIFIED)
+            self._cache[table_name] = (_UNVERIFIED, {kind: copy.deepcopy(value)})
+            return value
+        version = self._table_version(cursor, table_name)
+        if entry is not None and entry[0] == version and kind in entry[1]:
+            self._cache_stats['hits'] += 1
+            return copy.deepcopy(entry[1][kind])
+        self._cache_stats['misses'] += 1
+        value = load()
+        if version is not None:
+            if entry is None or entry[0] != version:
+                entry = self._cache[table_name] = (version, {})
+            entry[1][kind] = copy.deepcopy(value)
+        return value
+
+    def _table_version(self, cursor, table_name):
+        """
+        systables.version of a table, which changes whenever the table is
+        altered, or None if there is no such table.
+        """
+        checked = self._versions.get(table_name)
+        now = time.monotonic()
+        if checked is not None and now - checked[0] < self._cache_ttl:
+            return checked[1]
+        version = self._load_versions(cursor, [table_name]).get(table_name)
+        self._versions[table_name] = (now, version)
+        return version
+
+    def _load_versions(self, cursor, table_names):
+        condition, params = self._table_filter(table_names)
+        cursor.execute('SELECT t.tabname, t.version FROM systables t WHERE {}'.format(condition), params)
+        return {row[0]: row[1] for row in cursor.fetchall()}
+
+    def _table_filter(self, table_names):
+        """
+        WHERE condition on systables `t` selecting the given tables, or all
+        user tables if `table_names` is None, and its parameters.
+        """
+        if table_names is None:
+            return 't.tabid >= ?', [FIRST_USER_TABID]
+        if not table_names:
+            return '1 = 0', []
+        return 't.tabname IN ({})'.format(', '.join('?' * len(table_names))), list(table_names)
+
+    def _load_columns(self, cursor, table_names):
+        """{table_name: [(colname, coltype, collength, colno), ...]} in column order"""
+        condition, params = self._table_filter(table_names)
+        cursor.execute("""
+            SELECT t.tabname, c.colname, c.coltype, c.collength, c.colno
+            FROM syscolumns c
+            JOIN systables t
+            ON c.tabid=t.tabid
+            WHERE {}
+            ORDER BY t.tabname, c.colno
+        """.format(condition), params)
+        columns = defaultdict(list)
+        for row in cursor.fetchall():
+            columns[row[0]].append(tuple(row[1:]))
+        return columns
+
+    def _load_indexes(self, cursor, table_names):
+        """{table_name: [(idxname, idxtype, indexkeys, constrtype), ...]}"""
+        condition, params = self._table_filter(table_names)
+        cursor.execute("""
+            SELECT t.tabname, idx.idxname, idx.idxtype, idx.indexkeys, scs.constrtype
             FROM sysindices idx
-            JOIN systables st ON idx.tabid = st.tabid
-            WHERE st.tabname = '{}'
+            JOIN systables t ON idx.tabid = t.tabid
+            LEFT JOIN sysconstraints scs ON idx.idxname = scs.idxname AND idx.tabid = scs.tabid
+            WHERE {}
+        """.format(condition), params)
+        indexes = defaultdict(list)
+        for row in cursor.fetchall():
+            indexes[row[0]].append(tuple(row[1:]))
+        return indexes
+
+    def _load_references(self, cursor, table_names):
         """
+        {table_name: [(column_name, colno, referenced_table_name, referenced_column,
+        referenced_colno), ...]} for the first column of each foreign key
+        """
+        condition, params = self._table_filter(table_names)
+        cursor.execute("""
+            SELECT t.tabname,
+                   col1.colname, col1.colno,
+                   t2.tabname, col2.colname, col2.colno
+            FROM systables t
+            JOIN syscolumns col1 ON t.tabid = col1.tabid
+            JOIN sysindexes idx1 ON idx1.tabid = t.tabid AND col1.colno = idx1.part1
+            JOIN sysconstraints const1 ON idx1.idxname = const1.idxname AND const1.tabid = t.tabid
+            JOIN sysreferences ref ON ref.constrid = const1.constrid
+            JOIN sysconstraints const2 ON ref.primary = const2.constrid
+            JOIN sysindexes idx2 ON idx2.idxname = const2.idxname
+            JOIN syscolumns col2 ON col2.colno = idx2.part1 AND col2.tabid = idx2.tabid
+            JOIN systables t2 ON t2.tabid = idx2.tabid
+            WHERE const1.constrtype='R' AND {}
+        """.format(condition), params)
+        references = defaultdict(list)
+        for row in cursor.fetchall():
+            references[row[0]].append(tuple(row[1:]))
+        return references
+
+    @staticmethod
+    def _table_description(columns):
+        items = []
+        for colname, coltype, collength, _ in columns:
+            column = [colname, coltype % 256, None, collength, collength, None, 0 if coltype > 256 else 1, None,
+                      None]
+            if column[1] in (InformixTypes.SQL_TYPE_NUMERIC.num, InformixTypes.SQL_TYPE_DECIMAL.num):
+                column[4] = int(column[3] / 256)
+                column[5] = column[3] - column[4] * 256
+            items.append(FieldInfo(*column))
+        return items
+
+    @staticmethod
+    def _key_columns(references):
+        return [(colname, ref_table, ref_colname) for colname, _, ref_table, ref_colname, _ in references]
 
+    @staticmethod
+    def _indexes(columns, indexes):
+        column_names = {colno: colname for colname, _, _, colno in columns}
+        result = {}
+        for _, idx_type, keys, constr_type in indexes:
+            parts = keys.split(',')
+            # only indexes on a single column
+            if len(parts) != 1:
+                continue
+            # descending index keys are negative
+            result[column_names[abs(int(parts[0].strip().split()[0]))]] = {
+                'primary_key': True if constr_type == 'P' else False,
+                'unique': True if idx_type == 'U' else False
+            }
+        return result
+
+    @staticmethod
+    def _relations(references):
+        return {
+            int(colno) - 1: (int(ref_colno) - 1, ref_table)
+            for _, colno, ref_table, _, ref_colno in references
+        }
+
+    @staticmethod
+    def _constraints(columns, indexes):
+        constraints = {}
         # reverse name, AND index here
-        all_columns = {v: k for k, v in self._get_col_index(cursor, table_name).items()}
-        cursor.execute(index_query.format(table_name))
-        for name, idx_type, keys in cursor.fetchall():
+        all_columns = {int(colno) - 1: colname for colname, _, _, colno in columns}
+        for name, idx_type, keys, _ in indexes:
             # keys are in the format like "1 [1], 4 [1], 7 [1]",
             # which means including column #1, #4, AND #7
-            columns = [all_columns[int(k.strip().split()[0]) - 1] for k in keys.split(',')]
+            index_columns = [all_columns[abs(int(k.strip().split()[0])) - 1] for k in keys.split(',')]
             constraints[name] = {
-                'columns': columns,
-                'primary_key': len(columns) == 1 and idx_type == 'U',
+                'columns': index_columns,
+                'primary_key': len(index_columns) == 1 and idx_type == 'U',
                 'unique': idx_type == 'U',
                 'foreign_key': None,
                 'check': True,
@@ -0,0 +1,144 @@
+"""
+Bulk loading of rows from any iterable or a CSV file.
+
+Rows are streamed into the table in executemany() batches bound as
+parameter arrays, and committed every so many rows, so neither memory nor
+the transaction grows with the input.
+"""
+import csv
+import logging
+import os
+import time
+from collections import namedtuple
+from itertools import islice
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_COMMIT_EVERY = 10000
+
+LoadResult = namedtuple('LoadResult', 'rows batches commits seconds rows_per_second')
+
+
+def load_rows(rows, target, columns=None, using=DEFAULT_DB_ALIAS, batch_size=DEFAULT_BATCH_SIZE,
+              commit_every=DEFAULT_COMMIT_EVERY, disable_checks=False):
+    """
+    Insert `rows`, sequences of values in the order of `columns`, into
+    `target`, a model or a table name, and return a LoadResult.
+
+    For a model, `columns` are field names, by default all concrete fields
+    but an auto-incremented primary key. Values go through the fields, so
+    strings such as those read from a CSV file are converted. For a table,
+    `columns` are required, and values are handed to the driver unchanged.
+
+    Rows are sent `batch_size` at a time and committed every `commit_every`
+    rows; in an atomic block, they are all left to its transaction instead.
+    With `disable_checks`, the indexes and constraints of the table are
+    disabled during the load, and enabled again afterwards, which rebuilds
+    the indexes and checks the constraints once for all rows.
+    """
+    if batch_size < 1 or commit_every < 1:
+        raise ValueError('batch_size and commit_every must be positive')
+    connection = connections[using]
+    table, fields, columns = _resolve_target(target, columns)
+    qn = connection.ops.quote_name
+    sql = 'INSERT INTO %s (%s) VALUES (%s)' % (
+        qn(table), ', '.join(qn(column) for column in columns), ', '.join('?' * len(columns)),
+    )
+    input_sizes = connection.get_input_sizes(fields, force=True) if fields else None
+    batches = _batches(rows, batch_size, _row_converter(fields, connection) if fields else None)
+    outer_transaction = connection.in_atomic_block
+    loaded = batch_count = commits = 0
+    start = time.monotonic()
+
+    with connection.cursor() as cursor:
+        cursor.cursor.array_binding = True
+        if disable_checks:
+            cursor.execute('SET CONSTRAINTS, INDEXES FOR %s DISABLED' % qn(table))
+        try:
+            more = True
+            while more:
+                more = False
+                in_transaction = 0
+                with transaction.atomic(using=using):
+                    for batch in batches:
+                        if input_sizes:
+                            cursor.setinputsizes(input_sizes)
+                        cursor.executemany(sql, batch)
+                        batch_count += 1
+                        in_transaction += len(batch)
+                        if in_transaction >= commit_every:
+                            more = True
+                            break
+                loaded += in_transaction
+                if in_transaction and not outer_transaction:
+                    commits += 1
+                    elapsed = time.monotonic() - start
+                    logger.info('loaded %d rows into %s (%.0f rows/s)', loaded, table, loaded / elapsed)
+        finally:
+            if disable_checks:
+                cursor.execute('SET CONSTRAINTS, INDEXES FOR %s ENABLED' % qn(table))
+            cursor.cursor.array_binding = False
+
+    seconds = time.monotonic() - start
+    return LoadResult(loaded, batch_count, commits, seconds, loaded / seconds if seconds else 0.0)
+
+
+def load_csv(file, target, columns=None, header=True, delimiter=',', null=None, encoding='utf-8', **kwargs):
+    """
+    Insert the rows of a CSV file, given as a path or a text file, with
+    load_rows(). With `header`, the first line is skipped, and names the
+    columns unless `columns` is given. Values equal to `null` are loaded as
+    NULL.
+    """
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, newline='', encoding=encoding) as f:
+            return load_csv(f, target, columns, header, delimiter, null, encoding, **kwargs)
+
+    reader = csv.reader(file, delimiter=delimiter)
+    if header:
+        names = next(reader, [])
+        if columns is None:
+            columns = [name.strip() for name in names]
+    if null is not None:
+        reader = ([None if value == null else value for value in row] for row in reader)
+    return load_rows(reader, target, columns, **kwargs)
+
+
+def _resolve_target(target, columns):
+    """The table name, model fields (None for a table) and column names to load"""
+    if isinstance(target, str):
+        if not columns:
+            raise ValueError('columns are required to load rows into a table')
+        return target, None, list(columns)
+    opts = target._meta
+    if columns is None:
+        fields = [field for field in opts.concrete_fields if not field.db_returning]
+    else:
+        fields = [opts.pk if name == 'pk' else opts.get_field(name) for name in columns]
+    return opts.db_table, fields, [field.column for field in fields]
+
+
+def _row_converter(fields, connection):
+    count = len(fields)
+
+    def convert(row):
+        if len(row) != count:
+            raise ValueError('expected {} values, got {}: {!r}'.format(count, len(row), row))
+        return tuple(
+            field.get_db_prep_save(field.to_python(value), connection)
+            for field, value in zip(fields, row)
+        )
+    return convert
+
+
+def _batches(rows, batch_size, convert):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        yield [convert(row) for row in batch] if convert is not None else batch
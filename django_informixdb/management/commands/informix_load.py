@@ -0,0 +1,60 @@
+import sys
+
+from django.apps import apps
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from django_informixdb.loader import DEFAULT_BATCH_SIZE, DEFAULT_COMMIT_EVERY, load_csv
+
+
+class Command(BaseCommand):
+    help = 'Load the rows of a CSV file into a model or a table of an Informix database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help="CSV file to load, or '-' to read standard input.")
+        parser.add_argument('target', help='Model to load, as app_label.ModelName, or table name.')
+        parser.add_argument(
+            '--columns',
+            help='Comma-separated fields or columns of the values, instead of those named by the header.',
+        )
+        parser.add_argument('--no-header', action='store_false', dest='header',
+                            help='The file has no header line.')
+        parser.add_argument('--delimiter', default=',', help='Field delimiter. Defaults to ",".')
+        parser.add_argument('--null', help='Value loaded as NULL, e.g. an empty string.')
+        parser.add_argument('--encoding', default='utf-8', help='Encoding of the file. Defaults to utf-8.')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Rows per executemany() call. Defaults to %(default)s.')
+        parser.add_argument('--commit-every', type=int, default=DEFAULT_COMMIT_EVERY,
+                            help='Rows per transaction. Defaults to %(default)s.')
+        parser.add_argument('--disable-checks', action='store_true',
+                            help='Disable the indexes and constraints of the table during the load.')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS,
+                            help='Database to load into. Defaults to the "default" database.')
+
+    def handle(self, *args, **options):
+        target = options['target']
+        if '.' in target:
+            try:
+                target = apps.get_model(target)
+            except LookupError as e:
+                raise CommandError(str(e))
+        columns = options['columns'].split(',') if options['columns'] else None
+        file = sys.stdin if options['file'] == '-' else options['file']
+        try:
+            result = load_csv(
+                file, target, columns,
+                header=options['header'],
+                delimiter=options['delimiter'],
+                null=options['null'],
+                encoding=options['encoding'],
+                using=options['database'],
+                batch_size=options['batch_size'],
+                commit_every=options['commit_every'],
+                disable_checks=options['disable_checks'],
+            )
+        except (OSError, ValueError, ValidationError) as e:
+            raise CommandError(str(e))
+        self.stdout.write('Loaded {} rows in {:.1f}s ({:.0f} rows/s, {} commits)'.format(
+            result.rows, result.seconds, result.rows_per_second, result.commits,
+        ))
@@ -2,15 +2,43 @@ import datetime
 import decimal
 import uuid
 
+from django.conf import settings
 from django.db.backends.base.operations import BaseDatabaseOperations
 from django.db.models import Aggregate
-from django.db.backends import utils as backend_utils
+from django.utils import timezone
 from django.utils.dateparse import parse_date, parse_datetime, parse_time
 
 
+def passthrough(*types):
+    """
+    Mark a converter as returning values of the given types unchanged, so
+    that SQLCompiler.apply_converters() does not call it for them.
+    """
+    def decorator(converter):
+        converter.passthrough_types = frozenset(types)
+        return converter
+    return decorator
+
+
+@passthrough(bool)
+def convert_booleanfield_value(value, *ignore):
+    return value == 1
+
+
+@passthrough(bool, type(None))
+def convert_nullbooleanfield_value(value, *ignore):
+    if value is not None:
+        return value == 1
+
+
 class DatabaseOperations(BaseDatabaseOperations):
     compiler_module = "django_informixdb.compiler"
 
+    # Upper bound on the number of values bound by a single bulk operation.
+    # Bulk inserts bind one parameter set per row, so this caps the size of
+    # the parameter buffers the driver has to allocate for a batch.
+    bulk_max_params = 32767
+
     def quote_name(self, name):
         return name
 
@@ -23,6 +51,52 @@ class DatabaseOperations(BaseDatabaseOperations):
             last_identity_val = int(row[0])
         return last_identity_val
 
+    def last_insert_ids(self, cursor, table_name, pk, count):
+        """
+        Return the serial values given to the last `count` rows inserted into
+        table_name. Only valid if those rows received consecutive serials,
+        i.e. no other session inserted into the table in between.
+        """
+        serial = 'bigserial' if pk.get_internal_type() == 'BigAutoField' else 'sqlca.sqlerrd1'
+        cursor.execute("SELECT DBINFO('%s') FROM SYSTABLES WHERE TABID=1" % serial)
+        last = int(cursor.fetchone()[0])
+        return list(range(last - count + 1, last + 1))
+
+    def bulk_batch_size(self, fields, objs):
+        if fields:
+            return max(self.bulk_max_params // len(fields), 1)
+        return len(objs)
+
+    def merge_condition_sql(self, keys):
+        """
+        Condition on tables `t` and `s` matching rows that are equal on all
+        columns of any of `keys`, a list of column lists.
+        """
+        qn = self.quote_name
+        conditions = [' AND '.join('t.%s = s.%s' % (qn(c), qn(c)) for c in key) for key in keys]
+        if len(conditions) == 1:
+            return conditions[0]
+        return ' OR '.join('(%s)' % condition for condition in conditions)
+
+    def merge_sql(self, table, source, keys, update_columns=(), insert_columns=()):
+        """
+        MERGE the rows of the `source` table into `table`, matching them on
+        any of `keys` (see merge_condition_sql()). Matched rows get
+        `update_columns` updated, and rows without a match are inserted with
+        `insert_columns`.
+        """
+        qn = self.quote_name
+        sql = 'MERGE INTO %s t USING %s s ON %s' % (qn(table), qn(source), self.merge_condition_sql(keys))
+        if update_columns:
+            sql += ' WHEN MATCHED THEN UPDATE SET %s' % ', '.join(
+                't.%s = s.%s' % (qn(c), qn(c)) for c in update_columns
+            )
+        if insert_columns:
+            sql += ' WHEN NOT MATCHED THEN INSERT (%s) VALUES (%s)' % (
+                ', '.join(qn(c) for c in insert_columns), ', '.join('s.%s' % qn(c) for c in insert_columns),
+            )
+        return sql
+
     def fulltext_search_sql(self, field_name):
         return "LIKE '%%%s%%'" % field_name
 
@@ -67,42 +141,73 @@ class DatabaseOperations(BaseDatabaseOperations):
         converters = super(DatabaseOperations, self).get_db_converters(expression)
         internal_type = expression.output_field.get_internal_type()
         if internal_type == 'BooleanField':
-            converters.append(lambda value, *_: True if value == 1 else False)
+            converters.append(convert_booleanfield_value)
         elif internal_type == 'NullBooleanField':
-            converters.append(lambda value, *_: True if value == 1 else False if value == 0 else None)
+            converters.append(convert_nullbooleanfield_value)
         elif internal_type == 'DateTimeField':
             converters.append(self.convert_datetimefield_value)
+            if settings.USE_TZ:
+                converters.append(self.convert_datetimefield_value_to_aware)
         elif internal_type == 'DateField':
             converters.append(self.convert_datefield_value)
         elif internal_type == 'TimeField':
             converters.append(self.convert_timefield_value)
         elif internal_type == 'DecimalField':
-            converters.append(self.convert_decimalfield_value)
+            converters.append(self.get_decimalfield_converter(expression))
         elif internal_type == 'UUIDField':
             converters.append(self.convert_uuidfield_value)
         return converters
 
-    def convert_decimalfield_value(self, value, expression, connection, *ignore):
-        value = backend_utils.format_number(value, expression.output_field.max_digits,
-                                            expression.output_field.decimal_places)
-        if value is not None:
-            return decimal.Decimal(value)
-
+    def get_decimalfield_converter(self, expression):
+        """
+        Build the converter once per column, instead of copying the decimal
+        context and going through a formatted string for every value as
+        backend_utils.format_number() does.
+        """
+        max_digits = expression.output_field.max_digits
+        decimal_places = expression.output_field.decimal_places
+        context = decimal.getcontext().copy()
+        if max_digits is not None:
+            context.prec = max_digits
+        if decimal_places is None:
+            context.traps[decimal.Rounded] = 1
+
+            @passthrough(type(None))
+            def converter(value, *ignore):
+                return context.create_decimal(value)
+        else:
+            exponent = decimal.Decimal(1).scaleb(-decimal_places)
+
+            @passthrough(type(None))
+            def converter(value, *ignore):
+                return value.quantize(exponent, context=context)
+        return converter
+
+    @passthrough(datetime.date, type(None))
     def convert_datefield_value(self, value, expression, connection, *ignore):
         if value is not None and not isinstance(value, datetime.date):
             value = parse_date(value)
         return value
 
+    @passthrough(datetime.datetime, type(None))
     def convert_datetimefield_value(self, value, expression, connection, *ignore):
         if value is not None and not isinstance(value, datetime.datetime):
             value = parse_datetime(value)
         return value
 
+    @passthrough(type(None))
+    def convert_datetimefield_value_to_aware(self, value, expression, connection, *ignore):
+        if timezone.is_naive(value):
+            value = timezone.make_aware(value, self.connection.timezone)
+        return value
+
+    @passthrough(datetime.time, type(None))
     def convert_timefield_value(self, value, expression, connection, *ignore):
         if value is not None and not isinstance(value, datetime.time):
             value = parse_time(value)
         return value
 
+    @passthrough(uuid.UUID, type(None))
     def convert_uuidfield_value(self, value, expression, connection, *ignore):
         if value is not None:
             value = uuid.UUID(value)
@@ -112,14 +217,30 @@ class DatabaseOperations(BaseDatabaseOperations):
         return value
 
     def adapt_datetimefield_value(self, value):
-        # TODO: fix this, convert to DATETIME YEAR TO FRACTION(5)
-        # value is like '2016-05-23 12:26:56.111909+00:00',
-        # since informix only support fraction(5),
-        # we need remove the last digit for micro-seconds
-        return value.strftime('%Y-%m-%d %H:%M:%S.f')[:-1] if value else value
+        """
+        Bind datetimes natively, as timestamps. Informix stores naive values
+        with DATETIME YEAR TO FRACTION(5) precision, so aware values are made
+        naive in the connection's time zone and the last microsecond digit
+        is dropped, which the driver would otherwise reject as a fractional
+        truncation.
+        """
+        if value is None or hasattr(value, 'resolve_expression'):
+            return value
+        if timezone.is_aware(value):
+            if not settings.USE_TZ:
+                raise ValueError("Informix backend does not support timezone-aware datetimes when USE_TZ is False.")
+            value = timezone.make_naive(value, self.connection.timezone)
+        return value.replace(microsecond=value.microsecond - value.microsecond % 10)
 
     def adapt_timefield_value(self, value):
-        return value
+        """
+        Bind times natively. DATETIME HOUR TO SECOND has no fraction.
+        """
+        if value is None or hasattr(value, 'resolve_expression'):
+            return value
+        if timezone.is_aware(value):
+            raise ValueError("Informix backend does not support timezone-aware times.")
+        return value.replace(microsecond=0)
 
     def sql_flush(self, style, tables, sequences=(), reset_sequences=True, allow_cascade=False):
         # The reset_sequences keyword arg is provided by Django 3.1 and later,
@@ -132,8 +253,3 @@ class DatabaseOperations(BaseDatabaseOperations):
             style.SQL_FIELD(self.quote_name(table))
         ) for table in tables]
         return sql
-
-    #def bulk_insert_sql(self, fields, placeholder_rows):
-    #    placeholder_rows_sql = (", ".join(row) for row in placeholder_rows)
-    #    values_sql = ", ".join("(%s)" % sql for sql in placeholder_rows_sql)
-    #    return "VALUES " + values_sql
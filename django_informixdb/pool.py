@@ -0,0 +1,273 @@
+"""
+In-process pool of pyodbc connections, shared by all threads of a process.
+
+Connections are configured once when they are opened and are then checked in
+and out by the DatabaseWrapper of whichever thread needs one.
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pyodbc
+
+
+logger = logging.getLogger(__name__)
+
+
+class PooledConnection(object):
+    """Book-keeping for a connection owned by a pool"""
+
+    def __init__(self, connection, generation):
+        self.connection = connection
+        self.generation = generation
+        self.created = self.last_used = time.monotonic()
+
+
+class ConnectionPool(object):
+    """
+    A thread-safe pool of connections.
+
+    `factory` opens and configures a new connection. `check`, if given, is
+    called with a connection on checkout and must return False if the
+    connection is no longer usable. `run`, if given, is called as
+    `run(func, *args)` to make blocking driver calls, e.g. on a native thread
+    pool in cooperative mode.
+    """
+
+    def __init__(self, factory, min_size=0, max_size=10, max_idle=300, max_lifetime=3600, timeout=30,
+                 check=None, run=None):
+        if max_size < 1 or min_size > max_size:
+            raise ValueError('invalid pool size: min_size={} max_size={}'.format(min_size, max_size))
+        self.factory = factory
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.check = check
+        self.run = run
+        self.pid = os.getpid()
+
+        self._cond = threading.Condition()
+        self._idle = []
+        self._in_use = {}
+        # number of open connections, including ones still being opened
+        self._size = 0
+        # bumped by clear(); connections from older generations are not reused
+        self._generation = 0
+        self._counters = {
+            'opened': 0,
+            'closed': 0,
+            'checkouts': 0,
+            'waits': 0,
+            'failed_checks': 0,
+        }
+
+    def acquire(self):
+        """
+        Check a connection out of the pool, opening a new one if none is idle
+        and the pool is below max_size. Waits up to `timeout` seconds for a
+        connection to be released otherwise.
+        """
+        deadline = time.monotonic() + self.timeout
+        while True:
+            record = self._checkout(deadline)
+            if record is None:
+                record = self._open()
+            elif self.check is not None and not self.check(record.connection):
+                with self._cond:
+                    self._counters['failed_checks'] += 1
+                self._discard(record)
+                continue
+
+            with self._cond:
+                self._in_use[id(record.connection)] = record
+                self._counters['checkouts'] += 1
+            return record.connection
+
+    def release(self, connection, discard=False):
+        """
+        Return a connection to the pool. Any open transaction is rolled back;
+        connections that fail to roll back, have expired, or are flagged with
+        `discard` are closed instead of being reused.
+        """
+        with self._cond:
+            record = self._in_use.pop(id(connection), None)
+        if record is None:
+            self._close_connection(connection)
+            return
+
+        if not discard:
+            try:
+                self._driver_call(connection.rollback)
+            except pyodbc.Error as exc:
+                logger.info(f"discarding pooled connection that failed to roll back: {exc}")
+                discard = True
+
+        now = time.monotonic()
+        if discard or record.generation != self._generation or self._expired(record, now):
+            self._discard(record)
+            return
+
+        record.last_used = now
+        with self._cond:
+            self._idle.append(record)
+            self._cond.notify()
+
+    def prewarm(self, count):
+        """
+        Open connections in parallel until the pool holds `count` of them (or
+        max_size), leaving them idle. Return the time in seconds each new
+        connection took to open; failures are logged and skipped.
+        """
+        with self._cond:
+            needed = max(0, min(count, self.max_size) - self._size)
+            self._size += needed
+        if not needed:
+            return []
+
+        def timed_open():
+            start = time.monotonic()
+            record = self._open()
+            return record, time.monotonic() - start
+
+        timings = []
+        with ThreadPoolExecutor(max_workers=needed, thread_name_prefix='informix-prewarm') as executor:
+            for future in [executor.submit(timed_open) for _ in range(needed)]:
+                try:
+                    record, elapsed = future.result()
+                except Exception as exc:
+                    logger.warning(f"failed to prewarm a pooled connection: {exc}")
+                    continue
+                timings.append(elapsed)
+                with self._cond:
+                    self._idle.append(record)
+                    self._cond.notify()
+        return timings
+
+    def clear(self):
+        """
+        Close all idle connections. Connections currently checked out are
+        closed when they are released.
+        """
+        with self._cond:
+            self._generation += 1
+            idle, self._idle = self._idle, []
+        for record in idle:
+            self._discard(record)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+                **self._counters,
+            }
+
+    def _checkout(self, deadline):
+        """
+        Take an idle connection, or reserve room for a new one (returning
+        None), waiting until the deadline if the pool is exhausted.
+        """
+        with self._cond:
+            while True:
+                stale = self._evict(time.monotonic())
+                if self._idle:
+                    record = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    record = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise pyodbc.OperationalError(
+                        'HYT00', 'Timed out waiting for a pooled connection ({} in use)'.format(self._size)
+                    )
+                self._counters['waits'] += 1
+                self._cond.wait(remaining)
+
+        for expired in stale:
+            self._close_record(expired)
+        return record
+
+    def _open(self):
+        try:
+            connection = self.factory()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._counters['opened'] += 1
+            return PooledConnection(connection, self._generation)
+
+    def _evict(self, now):
+        """
+        Remove idle connections that have been idle for longer than max_idle
+        (while keeping min_size connections open) or have outlived
+        max_lifetime. Must be called with the lock held; the caller closes
+        the returned connections once the lock is released.
+        """
+        stale = []
+        keep = []
+        # oldest first, so the most recently used connections are kept
+        for record in self._idle:
+            idle_too_long = (self.max_idle is not None
+                             and now - record.last_used > self.max_idle
+                             and self._size - len(stale) > self.min_size)
+            if idle_too_long or self._expired(record, now):
+                stale.append(record)
+            else:
+                keep.append(record)
+        if stale:
+            self._idle = keep
+            self._size -= len(stale)
+            self._cond.notify(len(stale))
+        return stale
+
+    def _expired(self, record, now):
+        return self.max_lifetime is not None and now - record.created > self.max_lifetime
+
+    def _discard(self, record):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+        self._close_record(record)
+
+    def _close_record(self, record):
+        with self._cond:
+            self._counters['closed'] += 1
+        self._close_connection(record.connection)
+
+    def _close_connection(self, connection):
+        try:
+            self._driver_call(connection.close)
+        except pyodbc.Error as exc:
+            logger.info(f"error closing pooled connection: {exc}")
+
+    def _driver_call(self, func, *args):
+        if self.run is None:
+            return func(*args)
+        return self.run(func, *args)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(key, factory, **kwargs):
+    """
+    Return the process-wide pool registered under `key`, creating it with
+    the given factory and settings if needed. Pools inherited from a parent
+    process are abandoned, as their connections belong to the parent.
+    """
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool.pid != os.getpid():
+            pool = _pools[key] = ConnectionPool(factory, **kwargs)
+        return pool
@@ -22,6 +22,8 @@ class DatabaseSchemaEditor(BaseDatabaseSchemaEditor):
         Informix adds an index to foreign keys automatically
 
         This silences the error when Django tries to do the same thing independently
+
+        Cached introspection results are dropped, as the statement may have changed the schema.
         """
         try:
             super(DatabaseSchemaEditor, self).execute(sql, params)
@@ -29,6 +31,8 @@ class DatabaseSchemaEditor(BaseDatabaseSchemaEditor):
             if "CREATE INDEX" not in str(sql) and 'Index already exists' not in str(e):
                 # ugh, that feels dirty
                 raise e
+        finally:
+            self.connection.introspection.invalidate_cache()
 
     def skip_default(self, field):
         """
@@ -0,0 +1,110 @@
+"""
+Per-connection cache of prepared statements.
+
+pyodbc keeps a statement prepared as long as its cursor executes the same SQL
+again, so reusing statements means keeping cursors around. The cache parks
+idle cursors keyed by the SQL they last ran and hands them back out when the
+same SQL is executed again on the connection.
+"""
+import logging
+import re
+from collections import OrderedDict
+
+import pyodbc
+
+
+logger = logging.getLogger(__name__)
+
+DDL_RE = re.compile(r'^\s*(?:CREATE|ALTER|DROP|RENAME|TRUNCATE)\b', re.IGNORECASE)
+
+# -710: Table has been dropped, altered, or renamed
+STALE_STATEMENT_RE = re.compile(r'\(-710\)')
+
+
+def is_ddl(sql):
+    return DDL_RE.match(sql) is not None
+
+
+def is_stale_statement_error(exc):
+    return STALE_STATEMENT_RE.search(str(exc)) is not None
+
+
+class StatementCache(object):
+    """
+    An LRU cache of up to `size` parked cursors, one per SQL statement.
+
+    Cursors are taken out of the cache while in use, so a statement is never
+    shared by two cursors that are open at the same time.
+    """
+
+    def __init__(self, size):
+        if size < 1:
+            raise ValueError('invalid statement cache size: {}'.format(size))
+        self.size = size
+        self._cursors = OrderedDict()
+        self._counters = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'invalidations': 0,
+        }
+
+    def __len__(self):
+        return len(self._cursors)
+
+    def checkout(self, sql):
+        """
+        Remove and return the cursor parked for `sql`, or None if there is none.
+        """
+        cursor = self._cursors.pop(sql, None)
+        if cursor is None:
+            self._counters['misses'] += 1
+        else:
+            self._counters['hits'] += 1
+        return cursor
+
+    def park(self, sql, cursor):
+        """
+        Keep `cursor`, which last executed `sql`, for reuse. Any pending
+        results are discarded first; the statement stays prepared.
+        """
+        try:
+            while cursor.nextset():
+                pass
+        except pyodbc.Error as exc:
+            logger.info(f"not caching statement that failed to release its results: {exc}")
+            _close_cursor(cursor)
+            return
+
+        previous = self._cursors.pop(sql, None)
+        if previous is not None:
+            _close_cursor(previous)
+        self._cursors[sql] = cursor
+        while len(self._cursors) > self.size:
+            _, evicted = self._cursors.popitem(last=False)
+            self._counters['evictions'] += 1
+            _close_cursor(evicted)
+
+    def clear(self):
+        """
+        Close all parked cursors, e.g. after DDL made their plans stale or
+        before the connection is closed.
+        """
+        cursors, self._cursors = self._cursors, OrderedDict()
+        if cursors:
+            self._counters['invalidations'] += 1
+        for cursor in cursors.values():
+            _close_cursor(cursor)
+
+    def stats(self):
+        return {
+            'size': len(self._cursors),
+            **self._counters,
+        }
+
+
+def _close_cursor(cursor):
+    try:
+        cursor.close()
+    except pyodbc.Error as exc:
+        logger.info(f"error closing cached statement: {exc}")
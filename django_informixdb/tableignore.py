@@ -1,3 +1,17 @@
+"""
+Deprecated: DatabaseIntrospection.get_table_list() filters out the system
+catalog by tabid (see introspection.FIRST_USER_TABID) instead of by name.
+Kept for code importing EXCLUDED_TABLES; will be removed in a future version.
+"""
+import warnings
+
+warnings.warn(
+    'django_informixdb.tableignore is deprecated; system tables are those with a tabid below '
+    'django_informixdb.introspection.FIRST_USER_TABID',
+    DeprecationWarning,
+    stacklevel=2,
+)
+
 EXCLUDED_TABLES = [
     'sysaggregates',
     'sysams',
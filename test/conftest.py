@@ -26,3 +26,19 @@ def pytest_configure():
 @pytest.fixture(autouse=True)
 def configure_caplog(caplog):
     caplog.set_level("INFO")
+
+
+@pytest.fixture
+def db_config():
+    return {
+        "ENGINE": "django_informixdb",
+        "SERVER": "informix",
+        "NAME": "sysmaster",
+        "USER": "informix",
+        "PASSWORD": "in4mix",
+        "OPTIONS": {},
+        "AUTOCOMMIT": True,
+        "CONN_MAX_AGE": None,
+        "CONN_HEALTH_CHECKS": False,
+        "TIME_ZONE": None,
+    }
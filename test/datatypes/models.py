@@ -10,3 +10,15 @@ class Donut(models.Model):
     is_fresh = CharToBooleanField(default=False)
     is_only_fresh = CharToBooleanField(default=False, null=False)
     cost = models.DecimalField(decimal_places=2, max_digits=10, default=0)
+
+
+class Delivery(models.Model):
+    donut = models.ForeignKey(Donut, on_delete=models.CASCADE, null=True)
+    delivered_on = models.DateField()
+    delivered_at = models.DateTimeField()
+    slot = models.TimeField()
+
+
+class Recipe(models.Model):
+    donut = models.ForeignKey(Donut, on_delete=models.CASCADE)
+    steps = models.TextField()
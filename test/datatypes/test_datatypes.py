@@ -1,12 +1,16 @@
+import datetime
 from decimal import Decimal
 from collections import namedtuple
+from unittest import mock
 
+import pyodbc
 import pytest
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.db import connection, transaction
 from django.core.exceptions import ValidationError
 
-from .models import Donut
+from django_informixdb.base import CursorWrapper
+from .models import Delivery, Donut
 
 
 RawDonutResult = namedtuple('RawDonut', [
@@ -89,6 +93,36 @@ class DataTypesTestCase(TestCase):
         d = Donut(is_only_fresh=None)
         self.assertRaises(ValidationError, d.save)
 
+    @override_settings(USE_TZ=False)
+    def test_datetimes_round_trip_with_fraction_5(self):
+        delivered_at = datetime.datetime(2016, 5, 23, 12, 26, 56, 111909)
+        Delivery.objects.create(
+            delivered_on=datetime.date(2016, 5, 23), delivered_at=delivered_at, slot=datetime.time(12, 30),
+        )
+        d = Delivery.objects.get(delivered_at=delivered_at)
+        self.assertEqual(d.delivered_on, datetime.date(2016, 5, 23))
+        self.assertEqual(d.delivered_at, datetime.datetime(2016, 5, 23, 12, 26, 56, 111900))
+        self.assertEqual(d.slot, datetime.time(12, 30))
+        self.assertEqual(Delivery.objects.filter(delivered_at__gt=datetime.datetime(2016, 5, 23, 12, 26, 56, 111800),
+                                                 delivered_at__lt=datetime.datetime(2016, 5, 23, 12, 26, 57)).count(), 1)
+
+    @override_settings(USE_TZ=False)
+    def test_datetimes_bulk_create(self):
+        start = datetime.datetime(2016, 5, 23, 12, 0, 0, 10)
+        # bind the rows as arrays, with the timestamps sized for FRACTION(5)
+        with mock.patch.object(connection, '_fast_executemany', True), \
+                mock.patch.object(CursorWrapper, 'setinputsizes', autospec=True,
+                                  side_effect=CursorWrapper.setinputsizes) as setinputsizes:
+            Delivery.objects.bulk_create([
+                Delivery(delivered_on=start.date(), delivered_at=start + datetime.timedelta(seconds=i),
+                         slot=start.time())
+                for i in range(100)
+            ])
+        self.assertIn((pyodbc.SQL_TYPE_TIMESTAMP, 25, 5), setinputsizes.call_args.args[1])
+        deliveries = Delivery.objects.filter(delivered_at__gte=start).order_by('delivered_at')
+        self.assertEqual([d.delivered_at for d in deliveries],
+                         [start + datetime.timedelta(seconds=i) for i in range(100)])
+
 
 @pytest.mark.django_db(transaction=True)
 class TestDataTypesCharToBooleanRawSQL():
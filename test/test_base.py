@@ -1,11 +1,14 @@
 from unittest.mock import Mock, call
-from datetime import timedelta
+from datetime import date, datetime, time, timedelta, timezone
 
 import pyodbc
 import pytest
+from django.core.exceptions import ImproperlyConfigured
 from freezegun import freeze_time
+from django.db import models
+from django.db.backends.base.base import BaseDatabaseWrapper
 
-from django_informixdb.base import DatabaseWrapper
+from django_informixdb.base import DatabaseWrapper, decoder, is_ascii_compatible
 
 
 CONNECTION_FAILED_ERROR = pyodbc.Error(
@@ -20,22 +23,6 @@ AUTHENTICATION_ERROR = pyodbc.Error(
 )
 
 
-@pytest.fixture
-def db_config():
-    return {
-        "ENGINE": "django_informixdb",
-        "SERVER": "informix",
-        "NAME": "sysmaster",
-        "USER": "informix",
-        "PASSWORD": "in4mix",
-        "OPTIONS": {},
-        "AUTOCOMMIT": True,
-        "CONN_MAX_AGE": None,
-        "CONN_HEALTH_CHECKS": False,
-        "TIME_ZONE": None,
-    }
-
-
 @pytest.fixture
 def mock_autocommit_methods(mocker):
     mocker.patch.object(DatabaseWrapper, "get_autocommit", return_value=True, autospec=True)
@@ -279,3 +266,675 @@ def test_sleeps_between_connection_attempts(mocker, mock_sleep, mock_connect, db
         call(15, 100),
     ]
     assert mock_sleep.call_args_list == [call(1), call(2), call(3), call(4), call(5)]
+
+
+def test_executemany_uses_array_binding_when_enabled(mock_connection, mock_autocommit_methods, db_config):
+    mock_cursor = mock_connection.cursor.return_value
+    fast_flags = []
+    mock_cursor.executemany.side_effect = lambda *args: fast_flags.append(mock_cursor.fast_executemany)
+    db = DatabaseWrapper({**db_config, "OPTIONS": {"FAST_EXECUTEMANY": True}})
+    db.connect()
+    cursor = db.create_cursor()
+    cursor.setinputsizes([(pyodbc.SQL_INTEGER, 0, 0)])
+    cursor.executemany("INSERT INTO t (a) VALUES (?)", [(1,), (2,)])
+    assert fast_flags == [True]
+    assert mock_cursor.fast_executemany is False
+    assert mock_cursor.setinputsizes.call_args_list == [call([(pyodbc.SQL_INTEGER, 0, 0)]), call(None)]
+
+
+def test_executemany_does_not_use_array_binding_by_default(mock_connection, mock_autocommit_methods, db_config):
+    mock_cursor = mock_connection.cursor.return_value
+    db = DatabaseWrapper(db_config)
+    db.connect()
+    db.create_cursor().executemany("INSERT INTO t (a) VALUES (?)", [(1,), (2,)])
+    assert mock_cursor.executemany.call_count == 1
+    assert mock_cursor.setinputsizes.called is False
+
+
+def test_executemany_uses_array_binding_when_requested_by_cursor(mock_connection, mock_autocommit_methods, db_config):
+    mock_cursor = mock_connection.cursor.return_value
+    fast_flags = []
+    mock_cursor.executemany.side_effect = lambda *args: fast_flags.append(mock_cursor.fast_executemany)
+    db = DatabaseWrapper(db_config)
+    db.connect()
+    cursor = db.create_cursor()
+    cursor.array_binding = True
+    cursor.executemany("INSERT INTO t (a) VALUES (?)", [(1,), (2,)])
+    assert fast_flags == [True]
+
+
+def test_executemany_falls_back_when_array_binding_is_rejected(
+    mock_connection, mock_autocommit_methods, db_config
+):
+    mock_cursor = mock_connection.cursor.return_value
+    mock_cursor.executemany.side_effect = [pyodbc.Error("HYC00", "Optional feature not implemented"), None, None]
+    db = DatabaseWrapper({**db_config, "OPTIONS": {"FAST_EXECUTEMANY": True}})
+    db.connect()
+    cursor = db.create_cursor()
+    cursor.executemany("INSERT INTO t (a) VALUES (?)", [(1,), (2,)])
+    assert mock_cursor.executemany.call_count == 2
+    # the rejection is remembered, so the statement is not retried with array binding
+    mock_cursor.fast_executemany = None
+    cursor.executemany("INSERT INTO t (a) VALUES (?)", [(3,), (4,)])
+    assert mock_cursor.executemany.call_count == 3
+    assert mock_cursor.fast_executemany is None
+
+
+@pytest.mark.parametrize("error", [
+    pyodbc.DataError("22001", "String data right truncation"),
+    pyodbc.OperationalError("08S01", "Communication link failure"),
+])
+def test_executemany_does_not_fall_back_on_other_errors(mock_connection, mock_autocommit_methods, db_config, error):
+    mock_cursor = mock_connection.cursor.return_value
+    mock_cursor.executemany.side_effect = [error, None]
+    db = DatabaseWrapper({**db_config, "OPTIONS": {"FAST_EXECUTEMANY": True}})
+    db.connect()
+    with pytest.raises(type(error)):
+        db.create_cursor().executemany("INSERT INTO t (a) VALUES (?)", [(1,), (2,)])
+    assert mock_cursor.executemany.call_count == 1
+    assert db._array_binding_rejected == set()
+
+
+def test_executemany_does_not_fall_back_on_integrity_errors(mock_connection, mock_autocommit_methods, db_config):
+    mock_cursor = mock_connection.cursor.return_value
+    mock_cursor.executemany.side_effect = pyodbc.IntegrityError("23000", "Unique constraint violated")
+    db = DatabaseWrapper({**db_config, "OPTIONS": {"FAST_EXECUTEMANY": True}})
+    db.connect()
+    with pytest.raises(pyodbc.IntegrityError):
+        db.create_cursor().executemany("INSERT INTO t (a) VALUES (?)", [(1,), (1,)])
+    assert mock_cursor.executemany.call_count == 1
+
+
+def test_get_input_sizes_uses_informix_column_types(db_config):
+    db = DatabaseWrapper({**db_config, "OPTIONS": {"FAST_EXECUTEMANY": True}})
+    assert db.get_input_sizes([
+        models.IntegerField(),
+        models.CharField(max_length=30),
+        models.DecimalField(max_digits=10, decimal_places=2),
+        models.DateTimeField(),
+        models.DurationField(),
+        models.TextField(),
+        models.CharField(),
+    ]) == [
+        (pyodbc.SQL_INTEGER, 0, 0),
+        (pyodbc.SQL_VARCHAR, 30, 0),
+        (pyodbc.SQL_DECIMAL, 10, 2),
+        (pyodbc.SQL_TYPE_TIMESTAMP, 25, 5),
+        None,
+        None,
+        None,
+    ]
+
+
+def test_datetimes_are_bound_natively_with_fraction_5(db_config):
+    ops = DatabaseWrapper(db_config).ops
+    value = datetime(2016, 5, 23, 12, 26, 56, 111909)
+    assert ops.adapt_datetimefield_value(value) == datetime(2016, 5, 23, 12, 26, 56, 111900)
+    assert ops.adapt_datetimefield_value(None) is None
+    assert ops.adapt_timefield_value(time(12, 26, 56, 111909)) == time(12, 26, 56)
+    assert ops.adapt_datefield_value(date(2016, 5, 23)) == date(2016, 5, 23)
+
+
+def test_aware_datetimes_are_made_naive_in_connection_time_zone(db_config, settings):
+    settings.USE_TZ = True
+    db = DatabaseWrapper({**db_config, "TIME_ZONE": "America/Chicago"})
+    value = datetime(2016, 5, 23, 17, 0, tzinfo=timezone.utc)
+    assert db.ops.adapt_datetimefield_value(value) == datetime(2016, 5, 23, 12, 0)
+
+
+def test_aware_datetimes_are_rejected_without_use_tz(db_config, settings):
+    settings.USE_TZ = False
+    ops = DatabaseWrapper(db_config).ops
+    with pytest.raises(ValueError):
+        ops.adapt_datetimefield_value(datetime(2016, 5, 23, tzinfo=timezone.utc))
+
+
+def test_get_input_sizes_disables_array_binding_for_blobs(db_config):
+    db = DatabaseWrapper({**db_config, "OPTIONS": {"FAST_EXECUTEMANY": True}})
+    assert db.get_input_sizes([models.IntegerField(), models.BinaryField()]) is None
+
+
+def test_get_input_sizes_is_none_when_fast_executemany_is_disabled(db_config):
+    db = DatabaseWrapper(db_config)
+    assert db.get_input_sizes([models.IntegerField()]) is None
+    assert db.get_input_sizes([models.IntegerField()], force=True) == [(pyodbc.SQL_INTEGER, 0, 0)]
+
+
+@pytest.mark.parametrize("raw", [
+    b"plain ascii",
+    b"line one\\nline two",
+    "café".encode("utf-8"),
+    "café".encode("cp1252"),
+    "€ uro\\n".encode("cp1252"),
+    b"",
+])
+def test_output_converter_matches_decoder(db_config, raw):
+    db = DatabaseWrapper(db_config)
+    assert db._output_converter(raw) == decoder(raw.replace(b"\\n", b"\n"), db.encodings)
+
+
+def test_output_converter_skips_ascii_fast_path_for_incompatible_encodings(db_config):
+    db = DatabaseWrapper({**db_config, "OPTIONS": {"encodings": ("utf-16-le", "utf-8")}})
+    assert db._output_converter("ab".encode("utf-16-le")) == "ab"
+
+
+@pytest.mark.parametrize("encoding, expected", [
+    ("utf-8", True),
+    ("cp1252", True),
+    ("iso-8859-1", True),
+    ("utf-16", False),
+    ("cp037", False),
+    ("not-an-encoding", False),
+])
+def test_is_ascii_compatible(encoding, expected):
+    assert is_ascii_compatible(encoding) is expected
+
+
+def test_pooled_connections_are_returned_to_the_pool_on_close(
+    mock_connect, mock_autocommit_methods, db_config
+):
+    db = DatabaseWrapper({**db_config, "OPTIONS": {"POOL": {"HEALTH_CHECK": False}}}, alias="pooled")
+    db.connect()
+    conn = db.connection
+    db.close()
+    assert conn.close.called is False
+    db.connect()
+    assert db.connection is conn
+    assert mock_connect.call_count == 1
+    assert db.pool_stats()["checkouts"] == 2
+    db._pool.clear()
+
+
+def test_pool_stats_is_none_without_a_pool(db_config):
+    assert DatabaseWrapper(db_config).pool_stats() is None
+
+
+def test_prewarm_fills_the_pool(mock_connect, db_config):
+    db = DatabaseWrapper({**db_config, "OPTIONS": {"POOL": {}}}, alias="prewarmed")
+    assert len(db.prewarm(3)) == 3
+    assert mock_connect.call_count == 3
+    assert db.pool_stats()["idle"] == 3
+    db._pool.clear()
+
+
+
+@pytest.fixture
+def allow_ensure_connection(mocker):
+    """pytest-django blocks database access; allow it for mocked connections"""
+    def ensure_connection(self):
+        if self.connection is None:
+            self.connect()
+    mocker.patch.object(BaseDatabaseWrapper, "ensure_connection", ensure_connection)
+
+
+@pytest.fixture
+def executed_sql(mock_connection, allow_ensure_connection):
+    """The SQL statements executed on the mock connection's cursors"""
+    def sql():
+        return [c.args[0] for c in mock_connection.cursor.return_value.execute.call_args_list]
+    return sql
+
+
+def test_isolation_statements_are_not_repeated(
+    mock_connection, mock_autocommit_methods, db_config, executed_sql
+):
+    db = DatabaseWrapper(db_config)
+    db.connect()
+    db.read_dirty()
+    db.read_dirty()
+    db.read_committed()
+    db.read_committed()
+    assert executed_sql() == ["set isolation to dirty read;", "set isolation to committed read;"]
+
+
+def test_lock_mode_statements_are_not_repeated(
+    mock_connection, mock_autocommit_methods, db_config, executed_sql
+):
+    db = DatabaseWrapper({**db_config, "OPTIONS": {"LOCK_MODE_WAIT": 0}})
+    db.connect()
+    assert executed_sql() == ["SET LOCK MODE TO NOT WAIT"]
+    db.set_lock_mode(0)
+    db.set_lock_mode(10)
+    db.set_lock_mode(10)
+    assert executed_sql() == ["SET LOCK MODE TO NOT WAIT", "SET LOCK MODE TO WAIT 10"]
+
+
+def test_isolation_level_option_is_tracked(
+    mock_connection, mock_autocommit_methods, db_config, executed_sql
+):
+    db = DatabaseWrapper({**db_config, "OPTIONS": {"ISOLATION_LEVEL": "READ_UNCOMMITTED"}})
+    db.connect()
+    db.read_dirty()
+    assert executed_sql() == []
+
+
+def test_session_state_is_forgotten_when_a_statement_fails(
+    mock_connection, mock_autocommit_methods, db_config, executed_sql
+):
+    db = DatabaseWrapper(db_config)
+    db.connect()
+    mock_connection.cursor.return_value.execute.side_effect = [pyodbc.Error("", "boom"), None]
+    with pytest.raises(Exception):
+        db.read_dirty()
+    db.read_dirty()
+    assert executed_sql() == ["set isolation to dirty read;"] * 2
+
+
+def test_session_settings_restores_changed_settings(
+    mock_connection, mock_autocommit_methods, db_config, executed_sql
+):
+    db = DatabaseWrapper({**db_config, "OPTIONS": {"LOCK_MODE_WAIT": 5}})
+    db.connect()
+    db.read_committed()
+    with db.session_settings(isolation="dirty read", lock_mode_wait=5):
+        pass
+    assert executed_sql() == [
+        "SET LOCK MODE TO WAIT 5",
+        "set isolation to committed read;",
+        "set isolation to dirty read;",
+        "set isolation to committed read;",
+    ]
+
+
+def test_session_settings_restores_unknown_settings_to_the_server_default(
+    mock_connection, mock_autocommit_methods, db_config, executed_sql
+):
+    db = DatabaseWrapper(db_config)
+    db.connect()
+    with db.session_settings(lock_mode_wait=-1):
+        pass
+    assert executed_sql() == ["SET LOCK MODE TO WAIT", "SET LOCK MODE TO NOT WAIT"]
+
+
+def test_set_isolation_rejects_unknown_levels(db_config):
+    with pytest.raises(ValueError):
+        DatabaseWrapper(db_config).set_isolation("read whatever")
+
+
+def test_pooled_connection_session_is_reset_on_close(
+    mock_connection, mock_autocommit_methods, db_config, executed_sql
+):
+    db = DatabaseWrapper({**db_config, "OPTIONS": {"POOL": {"HEALTH_CHECK": False}, "LOCK_MODE_WAIT": 0}},
+                         alias="pooled_session")
+    db.connect()
+    db.set_lock_mode(-1)
+    db.close()
+    assert executed_sql()[-1] == "SET LOCK MODE TO NOT WAIT"
+    assert mock_connection.close.called is False
+    db._pool.clear()
+
+
+def test_pooled_connection_with_unknown_session_is_reset_to_the_server_default_on_close(
+    mock_connection, mock_autocommit_methods, db_config, executed_sql
+):
+    db = DatabaseWrapper({**db_config, "OPTIONS": {"POOL": {"HEALTH_CHECK": False}}},
+                         alias="pooled_session_unknown")
+    for _ in range(3):
+        db.connect()
+        db.read_dirty()
+        db.close()
+    assert executed_sql() == ["set isolation to dirty read;", "set isolation to committed read;"] * 3
+    assert mock_connection.close.called is False
+    assert db.pool_stats()["closed"] == 0
+    db._pool.clear()
+
+
+def test_set_lock_mode_is_sent_when_unknown(
+    mock_connection, mock_autocommit_methods, db_config, executed_sql
+):
+    db = DatabaseWrapper(db_config)
+    db.connect()
+    db.set_lock_mode(0)
+    assert executed_sql() == ["SET LOCK MODE TO NOT WAIT"]
+    with pytest.raises(ValueError):
+        db.set_lock_mode()
+
+
+def test_commit_and_rollback_use_native_transaction_calls(mock_connection, mock_autocommit_methods, db_config):
+    db = DatabaseWrapper(db_config)
+    db.connect()
+    mock_connection.autocommit = False
+    cursors_before = mock_connection.cursor.call_count
+    db.commit()
+    db.rollback()
+    assert mock_connection.commit.call_count == 1
+    assert mock_connection.rollback.call_count == 1
+    assert mock_connection.cursor.call_count == cursors_before
+
+
+def test_commit_under_autocommit_ends_explicit_transaction_in_sql(
+    mock_connection, mock_autocommit_methods, db_config, executed_sql
+):
+    db = DatabaseWrapper(db_config)
+    db.connect()
+    mock_connection.autocommit = True
+    db._start_transaction_under_autocommit()
+    db.commit()
+    assert executed_sql() == ["BEGIN WORK", "COMMIT WORK"]
+    assert mock_connection.commit.called is False
+
+
+def test_control_statements_reuse_one_cursor(
+    mock_connection, mock_autocommit_methods, db_config, executed_sql
+):
+    db = DatabaseWrapper(db_config)
+    db.connect()
+    cursors_before = mock_connection.cursor.call_count
+    db.read_dirty()
+    db.check_constraints()
+    db.set_lock_mode(5)
+    assert mock_connection.cursor.call_count == cursors_before + 1
+    assert len(executed_sql()) == 4
+    db.close()
+    assert mock_connection.cursor.return_value.close.called is True
+
+
+@pytest.fixture
+def distinct_cursors(mock_connection):
+    cursors = []
+
+    def new_cursor():
+        cursor = Mock(connection=mock_connection)
+        cursor.nextset.return_value = False
+        cursors.append(cursor)
+        return cursor
+
+    mock_connection.cursor.side_effect = new_cursor
+    return cursors
+
+
+def test_statement_cache_reuses_cursor_for_repeated_sql(
+    mock_autocommit_methods, db_config, allow_ensure_connection, distinct_cursors
+):
+    db = DatabaseWrapper({**db_config, "OPTIONS": {"STATEMENT_CACHE_SIZE": 10}})
+    db.connect()
+    for _ in range(3):
+        cursor = db.create_cursor()
+        cursor.execute("SELECT a FROM t WHERE b = ?", [1])
+        cursor.close()
+    assert len(distinct_cursors) == 1
+    assert distinct_cursors[0].execute.call_count == 3
+    assert distinct_cursors[0].close.called is False
+    assert db.statement_cache_stats() == {
+        "size": 1, "hits": 2, "misses": 1, "evictions": 0, "invalidations": 0,
+    }
+    db.close()
+    assert distinct_cursors[0].close.called is True
+
+
+def test_statement_cache_does_not_share_open_cursors(
+    mock_autocommit_methods, db_config, allow_ensure_connection, distinct_cursors
+):
+    db = DatabaseWrapper({**db_config, "OPTIONS": {"STATEMENT_CACHE_SIZE": 10}})
+    db.connect()
+    first, second = db.create_cursor(), db.create_cursor()
+    first.execute("SELECT a FROM t", [])
+    second.execute("SELECT a FROM t", [])
+    assert first.cursor is not second.cursor
+
+
+def test_statement_cache_does_not_park_cursors_of_a_previous_connection(
+    mock_autocommit_methods, db_config, allow_ensure_connection, distinct_cursors
+):
+    db = DatabaseWrapper({**db_config, "OPTIONS": {"STATEMENT_CACHE_SIZE": 10}})
+    db.connect()
+    cursor = db.create_cursor()
+    cursor.execute("SELECT a FROM t", [])
+    db.connection = Mock()
+    cursor.close()
+    assert distinct_cursors[0].close.called is True
+    assert db.statement_cache_stats()["size"] == 0
+
+
+def test_statement_cache_is_cleared_by_ddl(
+    mock_autocommit_methods, db_config, allow_ensure_connection, distinct_cursors
+):
+    db = DatabaseWrapper({**db_config, "OPTIONS": {"STATEMENT_CACHE_SIZE": 10}})
+    db.connect()
+    cursor = db.create_cursor()
+    cursor.execute("SELECT a FROM t", [])
+    cursor.execute("ALTER TABLE t ADD b INT", [])
+    cursor.close()
+    assert distinct_cursors[0].close.called is True
+    assert distinct_cursors[1].close.called is True
+    assert db.statement_cache_stats()["size"] == 0
+
+
+def test_statement_cache_prepares_stale_statement_again(
+    mock_autocommit_methods, db_config, allow_ensure_connection, distinct_cursors
+):
+    db = DatabaseWrapper({**db_config, "OPTIONS": {"STATEMENT_CACHE_SIZE": 10}})
+    db.connect()
+    cursor = db.create_cursor()
+    cursor.execute("SELECT a FROM t", [])
+    cursor.close()
+    distinct_cursors[0].execute.side_effect = pyodbc.Error(
+        "HY000", "Table (t) has been dropped, altered, or renamed. (-710) (SQLExecute)"
+    )
+    cursor = db.create_cursor()
+    cursor.execute("SELECT a FROM t", [])
+    assert cursor.cursor is distinct_cursors[1]
+    assert distinct_cursors[1].execute.called is True
+    assert distinct_cursors[0].close.called is True
+
+
+def test_fetch_buffer_size_is_set_in_connection_string(mock_connect, db_config):
+    db = DatabaseWrapper({**db_config, "OPTIONS": {"FETCH_BUFFER_SIZE": 32767}})
+    db.get_new_connection(db.get_connection_params())
+    assert "FetchBufferSize=32767" in mock_connect.call_args[0][0].split(";")
+
+
+def test_fetchmany_defaults_to_fetch_size(mock_connection, mock_autocommit_methods, db_config):
+    db = DatabaseWrapper({**db_config, "OPTIONS": {"FETCH_SIZE": 500}})
+    db.connect()
+    cursor = db.create_cursor()
+    cursor.cursor.fetchmany.return_value = [(1,), (2,)]
+    assert cursor.fetchmany() == [(1,), (2,)]
+    assert cursor.fetchmany(10) == [(1,), (2,)]
+    assert cursor.cursor.fetchmany.call_args_list == [call(500), call(10)]
+
+
+def test_iterating_a_cursor_streams_rows(mock_connection, mock_autocommit_methods, db_config):
+    db = DatabaseWrapper({**db_config, "OPTIONS": {"FETCH_SIZE": 2}})
+    db.connect()
+    cursor = db.create_cursor()
+    batches = iter([[(1,), (2,)], [(3,), (4,)], [(5,)], []])
+    cursor.cursor.fetchmany.side_effect = lambda size: next(batches)
+    rows = iter(cursor)
+    assert next(rows) == (1,)
+    # only the first batch is held in memory
+    assert cursor.cursor.fetchmany.call_count == 1
+    assert list(rows) == [(2,), (3,), (4,), (5,)]
+    assert cursor.cursor.fetchmany.call_args_list == [call(2)] * 4
+
+
+def test_fetchone_makes_a_single_driver_call(mock_connection, mock_autocommit_methods, db_config):
+    db = DatabaseWrapper(db_config)
+    db.connect()
+    cursor = db.create_cursor()
+    cursor.cursor.fetchone.return_value = (1,)
+    cursor.cursor.reset_mock()
+    assert cursor.fetchone() == (1,)
+    assert cursor.cursor.method_calls == [call.fetchone()]
+
+
+def test_fetchone_nextset_option_closes_result_set(mock_connection, mock_autocommit_methods, db_config):
+    db = DatabaseWrapper({**db_config, "OPTIONS": {"FETCHONE_NEXTSET": True}})
+    db.connect()
+    cursor = db.create_cursor()
+    cursor.cursor.fetchone.return_value = (1,)
+    cursor.cursor.reset_mock()
+    assert cursor.fetchone() == (1,)
+    assert cursor.cursor.method_calls == [call.fetchone(), call.nextset()]
+
+
+def test_changing_autocommit_discards_results_left_by_fetchone(
+    mock_connection, mock_autocommit_methods, db_config
+):
+    db = DatabaseWrapper(db_config)
+    db.connect()
+    pending, exhausted, closed = db.create_cursor(), db.create_cursor(), db.create_cursor()
+    for cursor in (pending, exhausted, closed):
+        cursor.cursor = Mock()
+        cursor.cursor.fetchone.return_value = (1,)
+        cursor.fetchone()
+    exhausted.cursor.fetchone.return_value = None
+    exhausted.fetchone()
+    closed.close()
+    db._set_autocommit(False)
+    assert pending.cursor.nextset.call_count == 1
+    assert exhausted.cursor.nextset.called is False
+    assert closed.cursor is None
+    db._set_autocommit(True)
+    assert pending.cursor.nextset.call_count == 1
+
+
+class FakeRow(list):
+    """Like pyodbc.Row, only equal to other rows and not hashable"""
+
+    def __eq__(self, other):
+        return super().__eq__(other) if isinstance(other, FakeRow) else NotImplemented
+
+    __hash__ = None
+
+
+def test_fetched_rows_are_tuples(mock_connection, mock_autocommit_methods, db_config):
+    db = DatabaseWrapper(db_config)
+    db.connect()
+    cursor = db.create_cursor()
+    rows = [FakeRow([1, "a"]), FakeRow([2, "b"])]
+    cursor.cursor.fetchall.return_value = rows
+    cursor.cursor.fetchmany.side_effect = [rows, []]
+    assert cursor.fetchall() == [(1, "a"), (2, "b")]
+    assert set(cursor.fetchmany(2)) == {(1, "a"), (2, "b")}
+    assert list(cursor) == []
+
+
+def test_rows_are_decoded_with_driver_charset(mock_connection, mock_autocommit_methods, db_config):
+    db = DatabaseWrapper(db_config)
+    db.connect()
+    cursor = db.create_cursor()
+    cursor.driver_charset = "utf-8"
+    cursor.cursor.fetchall.return_value = [[b"caf\xc3\xa9", 1]]
+    assert cursor.fetchall() == [("café", 1)]
+
+
+def test_cursor_attributes_are_delegated(mock_connection, mock_autocommit_methods, db_config):
+    db = DatabaseWrapper(db_config)
+    db.connect()
+    cursor = db.create_cursor()
+    cursor.cursor.description = (("a",),)
+    cursor.cursor.rowcount = 3
+    cursor.arraysize = 50
+    assert cursor.description == (("a",),)
+    assert cursor.rowcount == 3
+    assert cursor.cursor.arraysize == 50
+    assert cursor.messages is cursor.cursor.messages
+    with pytest.raises(AttributeError):
+        cursor.unknown_attribute = 1
+
+
+def test_format_params_list_adapts_columns_from_first_row(mock_connection, mock_autocommit_methods, db_config):
+    db = DatabaseWrapper(db_config)
+    db.connect()
+    cursor = db.create_cursor()
+    rows = [("a", True, None), ("b", False, None), ("c", None, False), None]
+    formatted = cursor.format_params_list(rows)
+    assert formatted == [("a", 1, None), ("b", 0, None), ("c", None, 0), ()]
+    assert formatted == [cursor.format_params(row) for row in rows]
+
+
+def test_format_params_list_keeps_rows_without_conversions(mock_connection, mock_autocommit_methods, db_config):
+    db = DatabaseWrapper(db_config)
+    db.connect()
+    cursor = db.create_cursor()
+    assert cursor.format_params_list([["a", 1], ["b", 2]]) == [("a", 1), ("b", 2)]
+
+
+def test_lazy_validation_waits_for_the_connection_to_be_used(
+    mock_connection, mock_is_usable, mock_autocommit_methods, db_config, allow_ensure_connection
+):
+    db = DatabaseWrapper({
+        **db_config,
+        "OPTIONS": {"VALIDATE_CONNECTION": True, "VALIDATION_INTERVAL": 0, "VALIDATION_MODE": "lazy"},
+    })
+    db.connect()
+    db.validate_connection()
+    assert mock_is_usable.called is False
+    db.ensure_connection()
+    assert mock_is_usable.call_count == 1
+    db.ensure_connection()
+    assert mock_is_usable.call_count == 1
+    stats = db.validation_stats()
+    assert stats["validations"] == 1
+    assert stats["failures"] == 0
+    assert stats["last_time"] is not None
+
+
+def test_lazy_validation_reconnects_unusable_connections(
+    mock_connect, mock_is_usable, mock_autocommit_methods, db_config, allow_ensure_connection
+):
+    mock_is_usable.return_value = False
+    db = DatabaseWrapper({
+        **db_config,
+        "OPTIONS": {"VALIDATE_CONNECTION": True, "VALIDATION_INTERVAL": 0, "VALIDATION_MODE": "lazy"},
+    })
+    db.connect()
+    db.validate_connection()
+    db.ensure_connection()
+    assert mock_connect.call_count == 2
+    assert db.connection is not None
+    assert db.validation_stats()["failures"] == 1
+
+
+def test_lazy_validation_skips_connections_in_a_transaction(
+    mock_connection, mock_is_usable, mock_autocommit_methods, db_config, allow_ensure_connection
+):
+    db = DatabaseWrapper({
+        **db_config,
+        "OPTIONS": {"VALIDATE_CONNECTION": True, "VALIDATION_INTERVAL": 0, "VALIDATION_MODE": "lazy"},
+    })
+    db.connect()
+    db.validate_connection()
+    db.in_atomic_block = True
+    db.ensure_connection()
+    assert mock_is_usable.called is False
+
+
+def test_invalid_validation_mode(db_config):
+    with pytest.raises(ImproperlyConfigured):
+        DatabaseWrapper({**db_config, "OPTIONS": {"VALIDATION_MODE": "sometimes"}})
+
+
+def test_circuit_breaker_fails_fast_after_repeated_connection_failures(mock_connect, mock_sleep, db_config):
+    mock_connect.side_effect = CONNECTION_FAILED_ERROR
+    db = DatabaseWrapper({
+        **db_config,
+        "CONNECTION_RETRY": {"MAX_ATTEMPTS": 2},
+        "CIRCUIT_BREAKER": {"FAILURE_THRESHOLD": 3, "RESET_TIMEOUT": 30},
+    }, alias="circuit_breaker")
+    with pytest.raises(pyodbc.Error):
+        db.get_new_connection(db.get_connection_params())
+    with pytest.raises(pyodbc.Error):
+        db.get_new_connection(db.get_connection_params())
+    # the breaker opened on the third failure, so there was no second retry
+    assert mock_connect.call_count == 3
+    assert mock_sleep.call_count == 1
+    assert db.circuit_breaker_stats()["state"] == "open"
+    with pytest.raises(pyodbc.OperationalError):
+        db.get_new_connection(db.get_connection_params())
+    assert mock_connect.call_count == 3
+    assert db.circuit_breaker_stats()["rejected"] == 1
+
+
+def test_circuit_breaker_ignores_errors_that_are_not_retried(mock_connect, db_config):
+    mock_connect.side_effect = AUTHENTICATION_ERROR
+    db = DatabaseWrapper({
+        **db_config,
+        "CIRCUIT_BREAKER": {"FAILURE_THRESHOLD": 1},
+    }, alias="circuit_breaker_auth")
+    for _ in range(2):
+        with pytest.raises(pyodbc.Error):
+            db.get_new_connection(db.get_connection_params())
+    assert mock_connect.call_count == 2
+    assert db.circuit_breaker_stats()["state"] == "closed"
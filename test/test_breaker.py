@@ -0,0 +1,97 @@
+from datetime import timedelta
+from unittest.mock import Mock
+
+import pyodbc
+import pytest
+from freezegun import freeze_time
+
+from django_informixdb.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, get_breaker
+
+
+def failing(exc=None):
+    return Mock(side_effect=exc or pyodbc.Error("08004", "failed (-908)"))
+
+
+def trip(breaker):
+    for _ in range(breaker.failure_threshold):
+        with pytest.raises(pyodbc.Error):
+            breaker.call(failing())
+
+
+def test_successful_calls_keep_breaker_closed():
+    breaker = CircuitBreaker(failure_threshold=2)
+    assert breaker.call(lambda: "conn") == "conn"
+    with pytest.raises(pyodbc.Error):
+        breaker.call(failing())
+    breaker.call(lambda: "conn")
+    with pytest.raises(pyodbc.Error):
+        breaker.call(failing())
+    assert breaker.state == CLOSED
+
+
+def test_breaker_opens_after_consecutive_failures_and_fails_fast():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    trip(breaker)
+    assert breaker.state == OPEN
+    func = Mock()
+    with pytest.raises(pyodbc.OperationalError, match="circuit breaker is open"):
+        breaker.call(func)
+    assert func.called is False
+    assert breaker.stats() == {"state": OPEN, "failures": 3, "opened": 1, "rejected": 1, "probes": 0}
+
+
+def test_single_probe_is_let_through_after_reset_timeout():
+    with freeze_time() as frozen_time:
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+        trip(breaker)
+        frozen_time.tick(delta=timedelta(seconds=30))
+
+        def probe():
+            # other callers are rejected while the probe is in flight
+            with pytest.raises(pyodbc.OperationalError):
+                breaker.call(Mock())
+            assert breaker.state == HALF_OPEN
+            return "conn"
+
+        assert breaker.call(probe) == "conn"
+        assert breaker.state == CLOSED
+        assert breaker.stats()["probes"] == 1
+
+
+def test_failed_probe_reopens_breaker():
+    with freeze_time() as frozen_time:
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+        trip(breaker)
+        frozen_time.tick(delta=timedelta(seconds=30))
+        with pytest.raises(pyodbc.Error):
+            breaker.call(failing())
+        assert breaker.state == OPEN
+        frozen_time.tick(delta=timedelta(seconds=10))
+        with pytest.raises(pyodbc.OperationalError, match="circuit breaker is open"):
+            breaker.call(Mock())
+
+
+def test_interrupted_probe_lets_next_call_probe():
+    with freeze_time() as frozen_time:
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+        trip(breaker)
+        frozen_time.tick(delta=timedelta(seconds=30))
+        with pytest.raises(KeyboardInterrupt):
+            breaker.call(failing(KeyboardInterrupt()))
+        assert breaker.state == OPEN
+        assert breaker.call(lambda: "conn") == "conn"
+        assert breaker.state == CLOSED
+        assert breaker.stats()["probes"] == 2
+
+
+def test_errors_that_are_not_failures_do_not_open_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, is_failure=lambda exc: "-908" in str(exc))
+    with pytest.raises(pyodbc.Error):
+        breaker.call(failing(pyodbc.Error("28000", "Incorrect password (-951)")))
+    assert breaker.state == CLOSED
+
+
+def test_get_breaker_returns_shared_breaker():
+    breaker = get_breaker("test_get_breaker", failure_threshold=2)
+    assert get_breaker("test_get_breaker") is breaker
+    assert get_breaker("test_get_breaker_other") is not breaker
@@ -1,5 +1,22 @@
-from django.test import TestCase
+import datetime
+from decimal import Decimal
+from unittest import mock
 
+import django
+import pyodbc
+import pytest
+from django.db import NotSupportedError, connection
+from django.db.backends.utils import format_number
+from django.db.models import Case, DateField, F, Value, When
+from django.db.models.expressions import Col
+from django.db.models.functions import Upper
+from django.db.models.sql.constants import CURSOR
+from django.db.models.sql.subqueries import InsertQuery, UpdateQuery
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from django_informixdb.base import CursorWrapper
+from django_informixdb.compiler import MAX_CACHED_SQL_LENGTH, _cached_rewrite_sql, rewrite_sql
 from test.datatypes.models import Donut
 
 
@@ -13,3 +30,324 @@ class CompilerCase(TestCase):
     def test_exists_returns_False_if_not_exists(self):
         exists = Donut.objects.filter(name="test").exists()
         self.assertFalse(exists)
+
+    def test_bulk_create_sends_rows_in_a_single_executemany(self):
+        donuts = [Donut(name='Donut {}'.format(i)) for i in range(50)]
+        # array binding is the one driver call per batch, without FAST_EXECUTEMANY
+        with mock.patch.object(CursorWrapper, '_fast_executemany', autospec=True,
+                               side_effect=CursorWrapper._fast_executemany) as fast_executemany:
+            Donut.objects.bulk_create(donuts)
+        self.assertEqual(fast_executemany.call_count, 1)
+        self.assertEqual(len(fast_executemany.call_args.args[2]), 50)
+        self.assertEqual(Donut.objects.filter(name__startswith='Donut ').count(), 50)
+
+    def test_bulk_create_respects_batch_size(self):
+        donuts = [Donut(name='Donut {}'.format(i)) for i in range(10)]
+        with CaptureQueriesContext(connection) as queries:
+            Donut.objects.bulk_create(donuts, batch_size=4)
+        inserts = [q for q in queries.captured_queries if 'INSERT' in q['sql']]
+        self.assertEqual(len(inserts), 3)
+        self.assertEqual(Donut.objects.filter(name__startswith='Donut ').count(), 10)
+
+    def test_bulk_create_leaves_serial_primary_keys_unset_by_default(self):
+        with CaptureQueriesContext(connection) as queries:
+            donuts = Donut.objects.bulk_create([Donut(name='Donut {}'.format(i)) for i in range(5)])
+        self.assertEqual([d.pk for d in donuts], [None] * 5)
+        self.assertEqual([q['sql'] for q in queries.captured_queries if q['sql'].startswith('LOCK')], [])
+        self.assertEqual(Donut.objects.filter(name__startswith='Donut ').count(), 5)
+
+    def test_bulk_create_sets_serial_primary_keys(self):
+        Donut.objects.create(name='Apple')
+        with mock.patch.object(connection, 'return_bulk_serials', True):
+            with CaptureQueriesContext(connection) as queries:
+                donuts = Donut.objects.bulk_create([Donut(name='Donut {}'.format(i)) for i in range(5)])
+        self.assertEqual(len([q for q in queries.captured_queries if q['sql'].startswith('LOCK TABLE')]), 1)
+        pks = [d.pk for d in donuts]
+        self.assertEqual(pks, list(range(pks[0], pks[0] + 5)))
+        # the serials are those the database gave each row
+        rows = Donut.objects.filter(name__startswith='Donut ').order_by('pk').values_list('pk', 'name')
+        self.assertEqual(list(rows), [(d.pk, d.name) for d in donuts])
+
+    def test_bulk_create_keeps_explicit_primary_keys(self):
+        donuts = Donut.objects.bulk_create([Donut(pk=1000 + i, name='Donut {}'.format(i)) for i in range(3)])
+        self.assertEqual([d.pk for d in donuts], [1000, 1001, 1002])
+        self.assertEqual(Donut.objects.get(pk=1001).name, 'Donut 1')
+
+    def test_bulk_create_ignores_conflicts(self):
+        Donut.objects.create(pk=1000, name='Apple')
+        Donut.objects.bulk_create([Donut(pk=1000, name='Boston'), Donut(pk=1001, name='Cruller')],
+                                  ignore_conflicts=True)
+        self.assertEqual(list(Donut.objects.order_by('pk').values_list('pk', 'name')),
+                         [(1000, 'Apple'), (1001, 'Cruller')])
+
+    def test_bulk_create_updates_conflicts(self):
+        Donut.objects.create(pk=1000, name='Apple', cost=1)
+        with CaptureQueriesContext(connection) as queries:
+            Donut.objects.bulk_create(
+                [Donut(pk=1000, name='Boston', cost=2), Donut(pk=1001, name='Cruller', cost=3)],
+                update_conflicts=True, unique_fields=['pk'], update_fields=['cost'],
+            )
+        self.assertEqual(len([q for q in queries.captured_queries if q['sql'].startswith('MERGE')]), 1)
+        self.assertEqual(list(Donut.objects.order_by('pk').values_list('pk', 'name', 'cost')),
+                         [(1000, 'Apple', 2), (1001, 'Cruller', 3)])
+
+    def test_values_list_returns_tuples(self):
+        donut = Donut.objects.create(name='Apple')
+        # no converters on these columns, so rows come straight from the cursor
+        self.assertEqual(list(Donut.objects.values_list('pk', 'name')), [(donut.pk, 'Apple')])
+        self.assertIn((donut.pk, 'Apple'), set(Donut.objects.values_list('pk', 'name')))
+
+    def test_bulk_update_merges_from_a_temp_table(self):
+        Donut.objects.bulk_create([Donut(name='Donut {}'.format(i)) for i in range(20)])
+        donuts = list(Donut.objects.order_by('pk'))
+        for i, donut in enumerate(donuts):
+            donut.name = 'Glazed {}'.format(i)
+            donut.cost = Decimal(i) / 4
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(Donut.objects.bulk_update(donuts, ['name', 'cost']), 20)
+        self.assertEqual([q['sql'] for q in queries.captured_queries if 'CASE' in q['sql']], [])
+        self.assertEqual(len([q for q in queries.captured_queries if q['sql'].startswith('MERGE')]), 1)
+        for i, donut in enumerate(Donut.objects.filter(pk__in=[d.pk for d in donuts]).order_by('pk')):
+            self.assertEqual((donut.name, donut.cost), ('Glazed {}'.format(i), Decimal(i) / 4))
+
+
+@pytest.mark.parametrize("sql,expected", [
+    ("SELECT a FROM t WHERE b = %s", ("SELECT a FROM t WHERE b = ?", 6)),
+    ("SELECT a FROM t WHERE b LIKE '%%' || %s", ("SELECT a FROM t WHERE b LIKE '%' || ?", 6)),
+    ("SELECT '%s', 'it''s %s' FROM t WHERE b = %s", ("SELECT '%s', 'it''s %s' FROM t WHERE b = ?", 6)),
+    ('SELECT "%s" FROM t', ('SELECT "%s" FROM t', 6)),
+    ("SELECT a FROM t WHERE b = 'SELECT' AND c = %s", ("SELECT a FROM t WHERE b = 'SELECT' AND c = ?", 6)),
+    ("INSERT INTO t (a) VALUES (%s)", ("INSERT INTO t (a) VALUES (?)", None)),
+    ("INSERT INTO t (a) SELECT %s FROM u", ("INSERT INTO t (a) SELECT ? FROM u", 24)),
+    ("UPDATE t SET a = 'x' WHERE b IN (SELECT b FROM u)", ("UPDATE t SET a = 'x' WHERE b IN (SELECT b FROM u)", 39)),
+])
+def test_rewrite_sql(sql, expected):
+    assert rewrite_sql(sql) == expected
+
+
+def test_rewrite_sql_caches_repeated_statements():
+    sql = "SELECT a FROM t WHERE b = %s AND c = 'x'"
+    rewrite_sql(sql)
+    hits = _cached_rewrite_sql.cache_info().hits
+    for _ in range(10):
+        assert rewrite_sql(sql) == ("SELECT a FROM t WHERE b = ? AND c = 'x'", 6)
+    assert _cached_rewrite_sql.cache_info().hits == hits + 10
+
+
+def test_rewrite_sql_does_not_cache_long_statements():
+    sql = "SELECT a FROM t WHERE b IN ({}) AND c = 'x'".format(", ".join(["%s"] * MAX_CACHED_SQL_LENGTH))
+    size = _cached_rewrite_sql.cache_info().currsize
+    rewritten, select_end = rewrite_sql(sql)
+    assert rewritten.count("?") == MAX_CACHED_SQL_LENGTH
+    assert select_end == 6
+    assert _cached_rewrite_sql.cache_info().currsize == size
+
+
+class RewriteSQLCase(SimpleTestCase):
+    def test_slicing_adds_skip_and_first_after_select(self):
+        sql, _ = Donut.objects.filter(name='x')[5:15].query.get_compiler(using='default').as_sql()
+        self.assertTrue(sql.startswith('SELECT SKIP 5 FIRST 10 '))
+
+    def test_wide_in_lookup(self):
+        queryset = Donut.objects.filter(pk__in=range(2000))
+        sql, params = queryset.query.get_compiler(using='default').as_sql()
+        self.assertEqual(sql.count('?'), 2000)
+        self.assertNotIn('%s', sql)
+
+
+def converted(field_name, values):
+    compiler = Donut.objects.all().query.get_compiler(using='default')
+    column = Donut._meta.get_field(field_name).get_col(Donut._meta.db_table)
+    converters = compiler.get_converters([column])
+    return [row[0] for row in compiler.apply_converters([(value,) for value in values], converters)]
+
+
+def test_boolean_converter():
+    assert converted('is_frosted', [True, False, 1, 0, None]) == [True, False, True, False, False]
+
+
+def test_decimal_converter_matches_format_number():
+    values = [Decimal('1'), Decimal('1.234'), Decimal('-0.005'), None]
+    expected = [
+        None if value is None else Decimal(format_number(value, 10, 2))
+        for value in values
+    ]
+    results = converted('cost', values)
+    assert results == expected
+    assert [str(value) for value in results[:3]] == ['1.00', '1.23', '-0.00']
+
+
+def test_converters_are_not_called_for_values_of_their_output_type(mocker):
+    parse_date = mocker.patch('django_informixdb.operations.parse_date', return_value=datetime.date(2020, 1, 2))
+    compiler = Donut.objects.all().query.get_compiler(using='default')
+    column = Col(Donut._meta.db_table, Donut._meta.get_field('id'), output_field=DateField())
+    converters = compiler.get_converters([column])
+    rows = [(datetime.date(2020, 1, 1),), (None,), ('2020-01-02',)]
+    assert [row[0] for row in compiler.apply_converters(rows, converters)] == [
+        datetime.date(2020, 1, 1), None, datetime.date(2020, 1, 2),
+    ]
+    parse_date.assert_called_once_with('2020-01-02')
+
+
+def test_apply_converters_skips_passthrough_types(mocker):
+    compiler = Donut.objects.all().query.get_compiler(using='default')
+    converter = mocker.Mock(return_value='converted', passthrough_types=frozenset([int]))
+    rows = compiler.apply_converters([(1, 'a'), ('b', 'c')], {0: ([converter], None)})
+    assert list(rows) == [[1, 'a'], ['converted', 'c']]
+    converter.assert_called_once_with('b', None, compiler.connection)
+
+
+def bulk_update_compiler(donuts, fields, queryset=None):
+    """The compiler of an update shaped like those of QuerySet.bulk_update()"""
+    queryset = Donut.objects.all() if queryset is None else queryset
+    query = queryset.filter(pk__in=[donut.pk for donut in donuts]).query.chain(UpdateQuery)
+    query.add_update_values({
+        name: Case(*[
+            When(pk=donut.pk, then=getattr(donut, name)) for donut in donuts
+        ], output_field=Donut._meta.get_field(name))
+        for name in fields
+    })
+    return query.get_compiler(using='default')
+
+
+def donuts():
+    return [Donut(pk=1, name='Apple', cost=Decimal('1.5')), Donut(pk=2, name='Boston', cost=Decimal(2))]
+
+
+def test_bulk_update_rows():
+    rows = bulk_update_compiler(
+        [Donut(pk=donut.pk, name=Value(donut.name), cost=Value(donut.cost)) for donut in donuts()], ['name', 'cost'],
+    )._bulk_update_rows()
+    cost = Donut._meta.get_field('cost')
+    assert rows == [
+        (1, 'Apple', cost.get_db_prep_save(Decimal('1.5'), connection)),
+        (2, 'Boston', cost.get_db_prep_save(Decimal(2), connection)),
+    ]
+
+
+@pytest.mark.parametrize("compiler", [
+    # values computed by the server
+    lambda: bulk_update_compiler([Donut(pk=1, name=F('trim_name'))], ['name']),
+    # additional filters
+    lambda: bulk_update_compiler([Donut(pk=1, name=Value('Apple'))], ['name'], Donut.objects.filter(is_frosted=True)),
+    # no values to set
+    lambda: Donut.objects.filter(pk__in=[1, 2]).query.chain(UpdateQuery).get_compiler(using='default'),
+])
+def test_other_updates_are_not_merged(compiler):
+    assert compiler()._bulk_update_rows() is None
+
+
+def test_bulk_update_executes_a_merge(mocker):
+    mocker.patch.object(connection, 'cursor')
+    cursor = connection.cursor.return_value.__enter__.return_value
+    cursor.rowcount = 2
+    compiler = bulk_update_compiler([Donut(pk=1, name=Value('Apple')), Donut(pk=2, name=Value('Boston'))], ['name'])
+    assert compiler.execute_sql(CURSOR) == 2
+    statements = [c.args[0] for c in cursor.execute.call_args_list]
+    assert statements == [
+        'CREATE TEMP TABLE django_merge_source (id integer, name lvarchar(100)) WITH NO LOG',
+        'MERGE INTO datatypes_donut t USING django_merge_source s ON t.id = s.id '
+        'WHEN MATCHED THEN UPDATE SET t.name = s.name',
+        'DROP TABLE django_merge_source',
+    ]
+    cursor.executemany.assert_called_once_with(
+        'INSERT INTO django_merge_source VALUES (?, ?)', [(1, 'Apple'), (2, 'Boston')],
+    )
+
+
+def test_bulk_update_merge_can_be_disabled(mocker):
+    mocker.patch.object(connection, 'merge_bulk_update', False)
+    execute_sql = mocker.patch('django.db.models.sql.compiler.SQLUpdateCompiler.execute_sql', return_value=1)
+    assert bulk_update_compiler([Donut(pk=1, name=Value('Apple'))], ['name']).execute_sql(CURSOR) == 1
+    execute_sql.assert_called_once_with(CURSOR)
+
+
+def test_merge_sql():
+    assert connection.ops.merge_sql('t', 's', [['a']], update_columns=['b'], insert_columns=['a', 'b']) == (
+        'MERGE INTO t t USING s s ON t.a = s.a WHEN MATCHED THEN UPDATE SET t.b = s.b '
+        'WHEN NOT MATCHED THEN INSERT (a, b) VALUES (s.a, s.b)'
+    )
+    assert connection.ops.merge_condition_sql([['a'], ['b', 'c']]) == '(t.a = s.a) OR (t.b = s.b AND t.c = s.c)'
+
+
+# unique_fields and update_fields are fields instead of names since Django 4.2
+requires_django_42 = pytest.mark.skipif(django.VERSION < (4, 2), reason='requires Django 4.2')
+
+
+def insert_compiler(donuts, fields, on_conflict=None, update_fields=(), unique_fields=()):
+    from django.db.models.constants import OnConflict
+
+    opts = Donut._meta
+    query = InsertQuery(
+        Donut, on_conflict=on_conflict and OnConflict(on_conflict),
+        update_fields=[opts.get_field(name) for name in update_fields],
+        unique_fields=[opts.get_field(name) for name in unique_fields],
+    )
+    query.insert_values([opts.get_field(name) for name in fields], donuts)
+    return query.get_compiler(using='default')
+
+
+@requires_django_42
+def test_bulk_insert_binds_rows_as_arrays(mocker):
+    mocker.patch.object(connection, 'cursor')
+    cursor = connection.cursor.return_value.__enter__.return_value
+    cursor.executemany.side_effect = lambda sql, rows: bindings.append(cursor.cursor.array_binding)
+    bindings = []
+    insert_compiler([Donut(name='Apple'), Donut(name='Boston')], ['name', 'cost']).execute_sql()
+    cursor.executemany.assert_called_once_with(
+        'INSERT INTO datatypes_donut (name, cost) VALUES (?, ?)', [('Apple', '0.00'), ('Boston', '0.00')],
+    )
+    assert bindings == [True]
+    assert cursor.cursor.array_binding is False
+    assert cursor.setinputsizes.call_args.args[0] == [(pyodbc.SQL_VARCHAR, 100, 0), (pyodbc.SQL_DECIMAL, 10, 2)]
+
+
+@requires_django_42
+def test_conflict_keys():
+    assert insert_compiler([], ['id', 'name'], 'ignore')._conflict_keys('ignore') == [['id']]
+    assert insert_compiler([], ['name'], 'ignore')._conflict_keys('ignore') == []
+    compiler = insert_compiler([], ['id', 'name'], 'update', update_fields=['name'], unique_fields=['name'])
+    assert compiler._conflict_keys('update') == [['name']]
+
+
+@requires_django_42
+def test_bulk_create_updates_conflicts_with_a_merge(mocker):
+    mocker.patch.object(connection, 'cursor')
+    cursor = connection.cursor.return_value.__enter__.return_value
+    cursor.fetchall.return_value = [(1,), (2,)]
+    compiler = insert_compiler(
+        [Donut(pk=1, name='Apple'), Donut(pk=2, name='Boston')], ['id', 'name'],
+        'update', update_fields=['name'], unique_fields=['id'],
+    )
+    assert compiler.execute_sql([Donut._meta.pk]) == [(1,), (2,)]
+    statements = [c.args[0] for c in cursor.execute.call_args_list]
+    assert statements == [
+        'CREATE TEMP TABLE django_merge_source (django_row integer, id integer, name lvarchar(100)) WITH NO LOG',
+        'MERGE INTO datatypes_donut t USING django_merge_source s ON t.id = s.id '
+        'WHEN MATCHED THEN UPDATE SET t.name = s.name '
+        'WHEN NOT MATCHED THEN INSERT (id, name) VALUES (s.id, s.name)',
+        'SELECT t.id FROM django_merge_source s JOIN datatypes_donut t ON t.id = s.id ORDER BY s.django_row',
+        'DROP TABLE django_merge_source',
+    ]
+    cursor.executemany.assert_called_once_with(
+        'INSERT INTO django_merge_source VALUES (?, ?, ?)', [(0, 1, 'Apple'), (1, 2, 'Boston')],
+    )
+
+
+@requires_django_42
+def test_bulk_create_ignores_conflicts_with_a_merge(mocker):
+    mocker.patch.object(connection, 'cursor')
+    cursor = connection.cursor.return_value.__enter__.return_value
+    compiler = insert_compiler([Donut(pk=1, name='Apple')], ['id', 'name'], 'ignore')
+    assert compiler.execute_sql() == []
+    assert cursor.execute.call_args_list[1].args[0] == (
+        'MERGE INTO datatypes_donut t USING django_merge_source s ON t.id = s.id '
+        'WHEN NOT MATCHED THEN INSERT (id, name) VALUES (s.id, s.name)'
+    )
+
+
+@requires_django_42
+def test_bulk_create_cannot_merge_expressions():
+    compiler = insert_compiler([Donut(pk=1, name=Upper(Value('Apple')))], ['id', 'name'], 'ignore')
+    with pytest.raises(NotSupportedError):
+        compiler.execute_sql()
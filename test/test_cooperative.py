@@ -0,0 +1,76 @@
+import time
+from unittest.mock import Mock
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+
+from django_informixdb.base import DatabaseWrapper
+from django_informixdb.cooperative import get_runner
+
+
+def test_no_runner_by_default():
+    assert get_runner(None) is None
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ImproperlyConfigured):
+        get_runner("asyncio")
+
+
+def slow_cursor_wrapper(db_config, mode):
+    db = DatabaseWrapper({**db_config, "OPTIONS": {"COOPERATIVE": mode}})
+    db.connection = Mock()
+    cursor = db.create_cursor()
+    # a query blocking its native thread, as pyodbc does
+    cursor.cursor.execute.side_effect = lambda sql, params: time.sleep(0.5)
+    return cursor
+
+
+def test_gevent_greenlets_make_progress_during_slow_query(db_config):
+    gevent = pytest.importorskip("gevent")
+    cursor = slow_cursor_wrapper(db_config, "gevent")
+    ticks = []
+
+    def ticker():
+        while True:
+            ticks.append(time.monotonic())
+            gevent.sleep(0.01)
+
+    background = gevent.spawn(ticker)
+    query = gevent.spawn(cursor.execute, "SELECT 1 FROM t", [])
+    query.join()
+    background.kill()
+    assert query.successful()
+    assert len(ticks) > 10
+
+
+def test_eventlet_greenthreads_make_progress_during_slow_query(db_config):
+    eventlet = pytest.importorskip("eventlet")
+    cursor = slow_cursor_wrapper(db_config, "eventlet")
+    ticks = []
+
+    def ticker():
+        while True:
+            ticks.append(time.monotonic())
+            eventlet.sleep(0.01)
+
+    background = eventlet.spawn(ticker)
+    query = eventlet.spawn(cursor.execute, "SELECT 1 FROM t", [])
+    query.wait()
+    background.kill()
+    assert len(ticks) > 10
+
+
+def test_connection_level_driver_calls_go_through_runner(db_config, mocker):
+    mocker.patch("pyodbc.connect")
+    db = DatabaseWrapper({**db_config, "OPTIONS": {"LOCK_MODE_WAIT": 0}})
+    run = db._cooperative = Mock(side_effect=lambda func, *args: func(*args))
+    connection = db.get_new_connection(db.get_connection_params())
+    cursor = connection.cursor.return_value
+    db.is_usable()
+    db._set_autocommit(False)
+    calls = [c.args for c in run.call_args_list]
+    assert (cursor.execute, "SET LOCK MODE TO NOT WAIT") in calls
+    assert (cursor.execute, db._validation_query) in calls
+    assert (setattr, connection, "autocommit", False) in calls
+    assert connection.autocommit is False
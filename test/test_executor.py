@@ -0,0 +1,123 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from django_informixdb.executor import AsyncExecutor
+
+
+class FakeQuerySet(object):
+    """Records the thread each row is produced on"""
+
+    def __init__(self, count):
+        self.count = count
+        self.threads = set()
+        self.chunk_size = None
+        self.closed = False
+
+    def iterator(self, chunk_size):
+        self.chunk_size = chunk_size
+        try:
+            for i in range(self.count):
+                self.threads.add(threading.get_ident())
+                yield i
+        finally:
+            self.closed = True
+
+
+@pytest.fixture
+def executor():
+    executor = AsyncExecutor(max_workers=4)
+    yield executor
+    executor.shutdown()
+
+
+def test_run_returns_result_from_a_worker_thread(executor):
+    result = asyncio.run(executor.run(lambda a, b=0: (a + b, threading.get_ident()), 1, b=2))
+    assert result[0] == 3
+    assert result[1] != threading.get_ident()
+
+
+def test_run_propagates_exceptions(executor):
+    def fail():
+        raise ValueError("failed")
+
+    with pytest.raises(ValueError):
+        asyncio.run(executor.run(fail))
+    assert executor.stats() == {"workers": 4, "idle": 4}
+
+
+def test_concurrent_jobs_run_in_parallel(executor):
+    async def main():
+        start = time.monotonic()
+        await asyncio.gather(*[executor.run(time.sleep, 0.2) for _ in range(8)])
+        return time.monotonic() - start
+
+    # 8 jobs of 0.2s on 4 workers take two rounds instead of eight
+    assert asyncio.run(main()) < 0.8
+
+
+def test_jobs_wait_for_a_free_worker():
+    executor = AsyncExecutor(max_workers=1)
+
+    async def main():
+        start = time.monotonic()
+        await asyncio.gather(executor.run(time.sleep, 0.1), executor.run(time.sleep, 0.1))
+        return time.monotonic() - start
+
+    try:
+        assert asyncio.run(main()) >= 0.2
+    finally:
+        executor.shutdown()
+
+
+def test_iterate_streams_rows_from_one_worker(executor):
+    queryset = FakeQuerySet(25)
+
+    async def main():
+        return [row async for row in executor.iterate(queryset, chunk_size=10)]
+
+    assert asyncio.run(main()) == list(range(25))
+    assert queryset.chunk_size == 10
+    assert len(queryset.threads) == 1
+    assert threading.get_ident() not in queryset.threads
+    assert queryset.closed is True
+
+
+def test_iterate_releases_worker_when_closed_early(executor):
+    queryset = FakeQuerySet(100)
+
+    async def main():
+        results = executor.iterate(queryset, chunk_size=10)
+        async for row in results:
+            if row == 5:
+                break
+        await results.aclose()
+        return executor.stats()
+
+    assert asyncio.run(main()) == {"workers": 4, "idle": 4}
+    assert queryset.closed is True
+
+
+def test_iterate_keeps_worker_while_other_jobs_run():
+    executor = AsyncExecutor(max_workers=2)
+    queryset = FakeQuerySet(30)
+
+    async def main():
+        job_threads = set()
+        async for row in executor.iterate(queryset, chunk_size=10):
+            job_threads.add(await executor.run(threading.get_ident))
+        return job_threads
+
+    try:
+        job_threads = asyncio.run(main())
+    finally:
+        executor.shutdown()
+    assert len(job_threads) == 1
+    assert job_threads.isdisjoint(queryset.threads)
+
+
+def test_invalid_number_of_workers():
+    with pytest.raises(ValueError):
+        AsyncExecutor(max_workers=0)
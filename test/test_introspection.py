@@ -0,0 +1,221 @@
+import time
+from unittest.mock import Mock
+
+import pytest
+from django.db import connection
+
+from django_informixdb.base import DatabaseWrapper
+from django_informixdb.introspection import FIRST_USER_TABID
+from django_informixdb.schema import DatabaseSchemaEditor
+
+
+COLUMNS = [
+    # tabname, colname, coltype, collength, colno
+    ("author", "id", 262, 4, 1),
+    ("author", "name", 13, 50, 2),
+    ("book", "id", 262, 4, 1),
+    ("book", "title", 269, 100, 2),
+    ("book", "price", 5, 8 * 256 + 2, 3),
+    ("book", "author_id", 258, 4, 4),
+]
+INDEXES = [
+    # tabname, idxname, idxtype, indexkeys, constrtype
+    ("author", "pk_author", "U", "1 [1]", "P"),
+    ("book", "pk_book", "U", "1 [1]", "P"),
+    ("book", "ix_book_author", "D", "4 [1]", "R"),
+    ("book", "ix_book_title_price", "D", "2 [1], -3 [1]", None),
+]
+VERSIONS = [
+    ("author", 1),
+    ("book", 1),
+]
+REFERENCES = [
+    # tabname, colname, colno, referenced tabname, referenced colname, referenced colno
+    ("book", "author_id", 4, "author", "id", 1),
+]
+
+
+class FakeCursor(object):
+    """Answers the catalog queries with the rows of the tables they ask for"""
+
+    def __init__(self):
+        self.queries = []
+        self.rows = []
+
+    def execute(self, sql, params):
+        self.queries.append((sql, params))
+        if "version" in sql:
+            rows = VERSIONS
+        elif "sysreferences" in sql:
+            rows = REFERENCES
+        elif "sysindices" in sql:
+            rows = INDEXES
+        else:
+            rows = COLUMNS
+        if "IN (" in sql:
+            rows = [row for row in rows if row[0] in params]
+        self.rows = rows
+
+    def fetchall(self):
+        return self.rows
+
+
+@pytest.fixture
+def cursor():
+    return FakeCursor()
+
+
+@pytest.fixture
+def make_introspection():
+    def make(**options):
+        return DatabaseWrapper({**connection.settings_dict, "OPTIONS": options}).introspection
+    return make
+
+
+@pytest.fixture
+def introspection(make_introspection):
+    return make_introspection()
+
+
+def catalog_queries(cursor):
+    return [sql for sql, _ in cursor.queries if "version" not in sql]
+
+
+def test_get_table_list_filters_system_tables_in_sql(introspection):
+    cursor = Mock()
+    cursor.fetchall.return_value = [("author", "T"), ("book_view", "V")]
+    tables = introspection.get_table_list(cursor)
+    assert [(t.name, t.type) for t in tables] == [("author", "t"), ("book_view", "v")]
+    sql, params = cursor.execute.call_args[0]
+    assert "tabid >= ?" in sql
+    assert params == [FIRST_USER_TABID]
+
+
+def test_get_table_description(introspection, cursor):
+    description = introspection.get_table_description(cursor, "book")
+    assert [(f.name, f.type_code, f.null_ok) for f in description] == [
+        ("id", 6, 0), ("title", 13, 0), ("price", 5, 1), ("author_id", 2, 0),
+    ]
+    assert (description[2].precision, description[2].scale) == (8, 2)
+    assert all(params == ["book"] for _, params in cursor.queries)
+
+
+def test_get_relations_uses_a_single_query(introspection, cursor):
+    assert introspection.get_relations(cursor, "book") == {3: (0, "author")}
+    assert len(catalog_queries(cursor)) == 1
+
+
+def test_get_key_columns(introspection, cursor):
+    assert introspection.get_key_columns(cursor, "book") == [("author_id", "author", "id")]
+
+
+def test_get_indexes(introspection, cursor):
+    assert introspection.get_indexes(cursor, "book") == {
+        "id": {"primary_key": True, "unique": True},
+        "author_id": {"primary_key": False, "unique": False},
+    }
+
+
+def test_get_constraints(introspection, cursor):
+    constraints = introspection.get_constraints(cursor, "book")
+    assert constraints["pk_book"]["columns"] == ["id"]
+    assert constraints["pk_book"]["primary_key"] is True
+    assert constraints["ix_book_title_price"]["columns"] == ["title", "price"]
+    assert constraints["ix_book_title_price"]["index"] is True
+
+
+def test_get_tables_metadata_matches_per_table_methods(make_introspection, cursor):
+    metadata = make_introspection().get_tables_metadata(cursor)
+    assert len(catalog_queries(cursor)) == 3
+    assert sorted(metadata) == ["author", "book"]
+    introspection = make_introspection(INTROSPECTION_CACHE_TTL=None)
+    for table_name, table in metadata.items():
+        assert table.description == introspection.get_table_description(FakeCursor(), table_name)
+        assert table.key_columns == introspection.get_key_columns(FakeCursor(), table_name)
+        assert table.indexes == introspection.get_indexes(FakeCursor(), table_name)
+        assert table.relations == introspection.get_relations(FakeCursor(), table_name)
+        assert table.constraints == introspection.get_constraints(FakeCursor(), table_name)
+
+
+def test_get_tables_metadata_for_some_tables(introspection, cursor):
+    metadata = introspection.get_tables_metadata(cursor, ["author"])
+    assert list(metadata) == ["author"]
+    assert all(params == ["author"] for _, params in cursor.queries)
+    assert introspection.get_tables_metadata(FakeCursor(), []) == {}
+
+
+def test_cached_metadata_is_reused_while_table_version_is_unchanged(make_introspection, cursor):
+    introspection = make_introspection(INTROSPECTION_CACHE_TTL=0)
+    constraints = introspection.get_constraints(cursor, "book")
+    constraints["pk_book"]["columns"].append("modified")
+    cursor.queries.clear()
+    assert introspection.get_constraints(cursor, "book")["pk_book"]["columns"] == ["id"]
+    assert catalog_queries(cursor) == []
+    assert len(cursor.queries) == 1
+    stats = introspection.cache_stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+
+
+def test_cache_is_invalidated_when_table_version_changes(make_introspection, cursor, monkeypatch):
+    introspection = make_introspection(INTROSPECTION_CACHE_TTL=0)
+    introspection.get_table_description(cursor, "book")
+    monkeypatch.setattr("test.test_introspection.VERSIONS", [("author", 1), ("book", 2)])
+    cursor.queries.clear()
+    introspection.get_table_description(cursor, "book")
+    assert len(catalog_queries(cursor)) == 1
+    assert introspection.cache_stats()["misses"] == 2
+
+
+def test_table_versions_are_trusted_for_ttl(make_introspection, cursor):
+    introspection = make_introspection(INTROSPECTION_CACHE_TTL=60)
+    introspection.get_tables_metadata(cursor)
+    cursor.queries.clear()
+    for table_name in ("author", "book"):
+        introspection.get_table_description(cursor, table_name)
+        introspection.get_relations(cursor, table_name)
+        introspection.get_constraints(cursor, table_name)
+    assert cursor.queries == []
+    assert introspection.cache_stats()["hits"] == 6
+
+
+def test_loaded_metadata_is_trusted_for_ttl(introspection, cursor, mocker):
+    introspection.get_table_description(cursor, "book")
+    introspection.get_table_description(cursor, "book")
+    assert catalog_queries(cursor) == [sql for sql, _ in cursor.queries]
+    assert len(cursor.queries) == 1
+    mocker.patch("time.monotonic", return_value=time.monotonic() + 60)
+    introspection.get_table_description(cursor, "book")
+    introspection.get_table_description(cursor, "book")
+    # the version is read once the TTL is over, and trusted again for the TTL
+    assert len(catalog_queries(cursor)) == 2
+    assert len(cursor.queries) == 3
+
+
+def test_cache_can_be_disabled(make_introspection, cursor):
+    introspection = make_introspection(INTROSPECTION_CACHE_TTL=None)
+    introspection.get_table_description(cursor, "book")
+    introspection.get_table_description(cursor, "book")
+    assert len(cursor.queries) == 2
+    assert catalog_queries(cursor) == [sql for sql, _ in cursor.queries]
+
+
+def test_schema_editor_invalidates_cache(cursor, mocker):
+    db = DatabaseWrapper({**connection.settings_dict, "OPTIONS": {"INTROSPECTION_CACHE_TTL": 60}})
+    db.introspection.get_table_description(cursor, "book")
+    mocker.patch("django.db.backends.base.schema.BaseDatabaseSchemaEditor.execute")
+    DatabaseSchemaEditor(db).execute("ALTER TABLE book ADD isbn CHAR(13)")
+    cursor.queries.clear()
+    db.introspection.get_table_description(cursor, "book")
+    assert len(cursor.queries) == 1
+    assert len(catalog_queries(cursor)) == 1
+    assert db.introspection.cache_stats()["invalidations"] == 1
+
+
+def test_connecting_invalidates_cache(cursor, mocker):
+    db = DatabaseWrapper(connection.settings_dict)
+    db.introspection.get_table_description(cursor, "book")
+    mocker.patch.object(db, "_open_connection")
+    db.get_new_connection(db.get_connection_params())
+    cursor.queries.clear()
+    db.introspection.get_table_description(cursor, "book")
+    assert len(catalog_queries(cursor)) == 1
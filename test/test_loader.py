@@ -0,0 +1,96 @@
+import io
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+
+from django_informixdb.loader import LoadResult, load_csv, load_rows
+from django_informixdb.management.commands.informix_load import Command
+from test.datatypes.models import Donut, Recipe
+
+
+@pytest.fixture
+def cursor(mocker):
+    mocker.patch.object(connection, 'cursor')
+    atomic = mocker.patch('django_informixdb.loader.transaction.atomic', return_value=MagicMock())
+    cursor = connection.cursor.return_value.__enter__.return_value
+    cursor.atomic = atomic
+    return cursor
+
+
+def test_load_rows_into_table_in_batches(cursor):
+    result = load_rows(([i, 'donut {}'.format(i)] for i in range(25)), 'donuts', ['id', 'name'],
+                       batch_size=10, commit_every=20)
+    assert [len(c.args[1]) for c in cursor.executemany.call_args_list] == [10, 10, 5]
+    assert cursor.executemany.call_args.args[0] == 'INSERT INTO donuts (id, name) VALUES (?, ?)'
+    assert cursor.cursor.array_binding is False
+    assert cursor.atomic.call_count == 2
+    assert (result.rows, result.batches, result.commits) == (25, 3, 2)
+    assert result.rows_per_second > 0
+
+
+def test_load_rows_streams_input(cursor):
+    produced = []
+
+    def rows():
+        for i in range(1000):
+            produced.append(i)
+            yield [i]
+
+    def executemany(sql, batch):
+        # no more than the batch being sent has been read
+        assert len(produced) == batch[-1][0] + 1
+    cursor.executemany.side_effect = executemany
+    assert load_rows(rows(), 'donuts', ['id'], batch_size=100).rows == 1000
+
+
+def test_load_rows_converts_values_with_model_fields(cursor):
+    load_rows([['Apple', 'Apple ', '1', True, False, '1.5']], Donut)
+    sql, batch = cursor.executemany.call_args.args
+    assert sql == (
+        'INSERT INTO datatypes_donut (name, trim_name, is_frosted, is_fresh, is_only_fresh, cost) '
+        'VALUES (?, ?, ?, ?, ?, ?)'
+    )
+    cost = Donut._meta.get_field('cost')
+    assert batch == [('Apple', 'Apple ', True, 'Y', 'N', cost.get_db_prep_save(Decimal('1.5'), connection))]
+
+
+def test_load_rows_lets_the_driver_size_text_columns(cursor):
+    load_rows([['1', 'Fry, then glaze.']], Recipe)
+    sizes = cursor.setinputsizes.call_args.args[0]
+    assert sizes[0] is not None
+    assert sizes[1] is None
+    assert cursor.executemany.call_args.args[1] == [(1, 'Fry, then glaze.')]
+
+
+def test_load_rows_disables_checks(cursor):
+    load_rows([], 'donuts', ['id'], disable_checks=True)
+    assert [c.args[0] for c in cursor.execute.call_args_list] == [
+        'SET CONSTRAINTS, INDEXES FOR donuts DISABLED',
+        'SET CONSTRAINTS, INDEXES FOR donuts ENABLED',
+    ]
+
+
+def test_load_rows_requires_columns_of_tables():
+    with pytest.raises(ValueError):
+        load_rows([], 'donuts')
+
+
+def test_load_csv(cursor):
+    load_csv(io.StringIO('id|name\n1|Apple\n2|\n'), 'donuts', delimiter='|', null='')
+    sql, batch = cursor.executemany.call_args.args
+    assert sql == 'INSERT INTO donuts (id, name) VALUES (?, ?)'
+    assert batch == [['1', 'Apple'], ['2', None]]
+
+
+def test_informix_load_command(mocker, tmp_path):
+    load_csv = mocker.patch('django_informixdb.management.commands.informix_load.load_csv',
+                            return_value=LoadResult(100, 1, 1, 2.0, 50.0))
+    path = tmp_path / 'donuts.csv'
+    out = io.StringIO()
+    call_command(Command(), str(path), 'datatypes.Donut', '--columns=name,cost', '--commit-every=50', stdout=out)
+    assert load_csv.call_args.args == (str(path), Donut, ['name', 'cost'])
+    assert load_csv.call_args.kwargs['commit_every'] == 50
+    assert out.getvalue() == 'Loaded 100 rows in 2.0s (50 rows/s, 1 commits)\n'
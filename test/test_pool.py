@@ -0,0 +1,164 @@
+import threading
+import time
+from unittest.mock import Mock
+
+import pyodbc
+import pytest
+from freezegun import freeze_time
+
+from django_informixdb.pool import ConnectionPool, get_pool
+
+
+@pytest.fixture
+def factory():
+    return Mock(side_effect=lambda: Mock(name="connection"))
+
+
+def test_acquire_opens_a_connection(factory):
+    pool = ConnectionPool(factory)
+    conn = pool.acquire()
+    assert factory.call_count == 1
+    assert pool.stats()["in_use"] == 1
+    pool.release(conn)
+    assert conn.rollback.called is True
+    assert pool.stats()["idle"] == 1
+
+
+def test_released_connections_are_reused(factory):
+    pool = ConnectionPool(factory)
+    conn = pool.acquire()
+    pool.release(conn)
+    assert pool.acquire() is conn
+    assert factory.call_count == 1
+
+
+def test_acquire_times_out_when_pool_is_exhausted(factory):
+    pool = ConnectionPool(factory, max_size=1, timeout=0.01)
+    pool.acquire()
+    with pytest.raises(pyodbc.OperationalError):
+        pool.acquire()
+
+
+def test_acquire_waits_for_a_released_connection(factory):
+    pool = ConnectionPool(factory, max_size=1, timeout=5)
+    conn = pool.acquire()
+    threading.Timer(0.05, pool.release, args=(conn,)).start()
+    assert pool.acquire() is conn
+    assert pool.stats()["waits"] >= 1
+
+
+def test_failed_factory_frees_its_slot():
+    pool = ConnectionPool(Mock(side_effect=pyodbc.Error("", "boom")), max_size=1, timeout=0)
+    with pytest.raises(pyodbc.Error):
+        pool.acquire()
+    assert pool.stats()["size"] == 0
+
+
+def test_unhealthy_connections_are_replaced_on_checkout(factory):
+    pool = ConnectionPool(factory, check=lambda conn: conn is not broken)
+    broken = pool.acquire()
+    pool.release(broken)
+    conn = pool.acquire()
+    assert conn is not broken
+    assert broken.close.called is True
+    assert pool.stats()["failed_checks"] == 1
+    assert pool.stats()["size"] == 1
+
+
+def test_connections_are_discarded_on_request(factory):
+    pool = ConnectionPool(factory)
+    conn = pool.acquire()
+    pool.release(conn, discard=True)
+    assert conn.close.called is True
+    assert conn.rollback.called is False
+    assert pool.stats()["size"] == 0
+
+
+def test_connections_that_fail_to_roll_back_are_discarded(factory):
+    pool = ConnectionPool(factory)
+    conn = pool.acquire()
+    conn.rollback.side_effect = pyodbc.Error("", "connection lost")
+    pool.release(conn)
+    assert conn.close.called is True
+    assert pool.stats()["idle"] == 0
+
+
+def test_driver_calls_go_through_runner(factory):
+    run = Mock(side_effect=lambda func, *args: func(*args))
+    pool = ConnectionPool(factory, run=run)
+    conn = pool.acquire()
+    pool.release(conn)
+    pool.clear()
+    assert [c.args[0] for c in run.call_args_list] == [conn.rollback, conn.close]
+
+
+def test_idle_connections_are_evicted_down_to_min_size(factory):
+    with freeze_time() as frozen_time:
+        pool = ConnectionPool(factory, min_size=1, max_idle=10)
+        conns = [pool.acquire() for _ in range(3)]
+        for conn in conns:
+            pool.release(conn)
+        frozen_time.tick(11)
+        pool.release(pool.acquire())
+        stats = pool.stats()
+        assert stats["size"] == 1
+        assert stats["closed"] == 2
+
+
+def test_connections_are_retired_after_max_lifetime(factory):
+    with freeze_time() as frozen_time:
+        pool = ConnectionPool(factory, max_lifetime=60)
+        conn = pool.acquire()
+        frozen_time.tick(61)
+        pool.release(conn)
+        assert conn.close.called is True
+        assert pool.acquire() is not conn
+
+
+def test_clear_closes_idle_and_retires_checked_out_connections(factory):
+    pool = ConnectionPool(factory)
+    idle, busy = pool.acquire(), pool.acquire()
+    pool.release(idle)
+    pool.clear()
+    assert idle.close.called is True
+    pool.release(busy)
+    assert busy.close.called is True
+    assert pool.stats()["size"] == 0
+
+
+def test_get_pool_returns_the_same_pool_for_a_key(factory):
+    pool = get_pool("test_get_pool", factory)
+    assert get_pool("test_get_pool", factory) is pool
+
+
+def test_get_pool_replaces_pools_inherited_from_a_parent_process(mocker, factory):
+    pool = get_pool("test_get_pool_fork", factory)
+    mocker.patch("os.getpid", return_value=pool.pid + 1)
+    assert get_pool("test_get_pool_fork", factory) is not pool
+
+
+def test_prewarm_opens_connections_in_parallel():
+    def slow_factory():
+        time.sleep(0.2)
+        return Mock(name="connection")
+
+    pool = ConnectionPool(slow_factory, max_size=4)
+    start = time.monotonic()
+    timings = pool.prewarm(4)
+    assert time.monotonic() - start < 0.6
+    assert len(timings) == 4
+    assert pool.stats()["idle"] == 4
+
+
+def test_prewarm_does_not_exceed_max_size_or_reopen_connections(factory):
+    pool = ConnectionPool(factory, max_size=2)
+    assert len(pool.prewarm(5)) == 2
+    assert pool.prewarm(2) == []
+    assert factory.call_count == 2
+
+
+def test_prewarm_skips_connections_that_fail_to_open():
+    factory = Mock(side_effect=[Mock(), pyodbc.Error("", "boom")])
+    pool = ConnectionPool(factory, max_size=2)
+    assert len(pool.prewarm(2)) == 1
+    assert pool.stats()["size"] == 1
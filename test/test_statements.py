@@ -0,0 +1,96 @@
+from unittest.mock import Mock
+
+import pyodbc
+import pytest
+
+from django_informixdb.statements import StatementCache, is_ddl, is_stale_statement_error
+
+
+def make_cursor():
+    cursor = Mock()
+    cursor.nextset.return_value = False
+    return cursor
+
+
+def test_checkout_returns_parked_cursor_once():
+    cache = StatementCache(2)
+    cursor = make_cursor()
+    assert cache.checkout("SELECT 1") is None
+    cache.park("SELECT 1", cursor)
+    assert cache.checkout("SELECT 1") is cursor
+    assert cache.checkout("SELECT 1") is None
+    assert cache.stats() == {"size": 0, "hits": 1, "misses": 2, "evictions": 0, "invalidations": 0}
+
+
+def test_park_discards_pending_results():
+    cache = StatementCache(2)
+    cursor = make_cursor()
+    cursor.nextset.side_effect = [True, False]
+    cache.park("SELECT 1", cursor)
+    assert cursor.nextset.call_count == 2
+    assert cursor.close.called is False
+
+
+def test_park_closes_cursor_that_fails_to_release_results():
+    cache = StatementCache(2)
+    cursor = make_cursor()
+    cursor.nextset.side_effect = pyodbc.Error("HY000", "failed")
+    cache.park("SELECT 1", cursor)
+    assert cursor.close.called is True
+    assert len(cache) == 0
+
+
+def test_park_replaces_cursor_for_same_statement():
+    cache = StatementCache(2)
+    first, second = make_cursor(), make_cursor()
+    cache.park("SELECT 1", first)
+    cache.park("SELECT 1", second)
+    assert first.close.called is True
+    assert cache.checkout("SELECT 1") is second
+
+
+def test_least_recently_used_statement_is_evicted():
+    cache = StatementCache(2)
+    cursors = [make_cursor() for _ in range(3)]
+    cache.park("SELECT 1", cursors[0])
+    cache.park("SELECT 2", cursors[1])
+    cache.park("SELECT 1", cache.checkout("SELECT 1"))
+    cache.park("SELECT 3", cursors[2])
+    assert cursors[1].close.called is True
+    assert cursors[0].close.called is False
+    assert cache.stats()["evictions"] == 1
+    assert cache.checkout("SELECT 2") is None
+
+
+def test_clear_closes_all_cursors():
+    cache = StatementCache(2)
+    cursors = [make_cursor(), make_cursor()]
+    cache.park("SELECT 1", cursors[0])
+    cache.park("SELECT 2", cursors[1])
+    cache.clear()
+    assert all(cursor.close.called for cursor in cursors)
+    assert len(cache) == 0
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_invalid_size():
+    with pytest.raises(ValueError):
+        StatementCache(0)
+
+
+@pytest.mark.parametrize("sql,expected", [
+    ("CREATE TABLE t (a int)", True),
+    ("  alter table t add b int", True),
+    ("DROP INDEX i", True),
+    ("SELECT created FROM t", False),
+    ("UPDATE t SET dropped = 1", False),
+])
+def test_is_ddl(sql, expected):
+    assert is_ddl(sql) is expected
+
+
+def test_is_stale_statement_error():
+    assert is_stale_statement_error(pyodbc.Error(
+        "HY000", "[Informix]Table (t) has been dropped, altered, or renamed. (-710) (SQLExecute)"
+    ))
+    assert not is_stale_statement_error(pyodbc.Error("HY000", "Could not do a physical-order read (-244)"))
@@ -0,0 +1,11 @@
+import importlib
+import sys
+
+import pytest
+
+
+def test_tableignore_is_deprecated():
+    sys.modules.pop("django_informixdb.tableignore", None)
+    with pytest.warns(DeprecationWarning):
+        tableignore = importlib.import_module("django_informixdb.tableignore")
+    assert "systables" in tableignore.EXCLUDED_TABLES